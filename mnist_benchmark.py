@@ -0,0 +1,261 @@
+"""Benchmark de passage à l'échelle des modèles MNIST.
+
+Exemples :
+    python mnist_benchmark.py run --sizes 1000 5000 10000 30000 60000 --output bench.json
+    python mnist_benchmark.py compare bench_ref.json bench.json --threshold 0.10
+    python mnist_benchmark.py ann --n-lists 64 --n-probes 1 2 4 8 16 --output ann.json
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+
+import numpy as np
+import sklearn
+from sklearn import svm
+from sklearn.linear_model import LogisticRegression
+from sklearn.multiclass import OneVsOneClassifier, OneVsRestClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.svm import LinearSVC
+
+from mnist_function import MNIST_DATA_PATH, IVFKNeighborsClassifier, get_classification_metrics, get_peak_rss_mb, load_mnist, predict_labels_and_scores
+
+DEFAULT_SIZES = [1000, 5000, 10000, 30000, 60000]
+COMPARED_METRICS = ["fit_wall", "predict_wall", "metrics_wall", "peak_rss_mb"]
+
+
+def get_benchmark_models(random_state=0, n_neighbors=3):
+    # Même liste que dans les notebooks ; "LogisticR OVR" passe par OneVsRestClassifier
+    # car le paramètre multi_class de LogisticRegression n'existe plus dans les versions récentes
+    return {"LogisticR OVR": OneVsRestClassifier(LogisticRegression(random_state=random_state)),
+            "LogisticR multinomial": LogisticRegression(random_state=random_state),
+            "KNN": KNeighborsClassifier(n_neighbors=n_neighbors),
+            "KNN IVF": IVFKNeighborsClassifier(n_neighbors=n_neighbors, random_state=random_state),
+            "LinearSVC OVR": LinearSVC(random_state=random_state),
+            "SVC OVR": svm.SVC(random_state=random_state, decision_function_shape='ovr'),
+            "SVC OVO": svm.SVC(random_state=random_state, decision_function_shape='ovo'),
+            "OVRC-SVC": OneVsRestClassifier(svm.SVC(random_state=random_state)),
+            "OVOC-SVC": OneVsOneClassifier(svm.SVC(random_state=random_state))}
+
+
+def _measure(func):
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    res = func()
+    return res, time.perf_counter() - wall0, time.process_time() - cpu0
+
+
+def run_one(model_name, train_size, test_size=10000, data_path=MNIST_DATA_PATH, random_state=0):
+    """Entraîne et évalue un modèle sur les train_size premiers échantillons ; retourne une ligne de résultats."""
+    model = get_benchmark_models(random_state=random_state)[model_name]
+    X_train, X_test, y_train, y_test = load_mnist(data_path)
+    X_train, y_train = X_train[:train_size], y_train[:train_size]
+    X_test, y_test = X_test[:test_size], y_test[:test_size]
+
+    _, fit_wall, fit_cpu = _measure(lambda: model.fit(X_train, y_train))
+    (y_pred, y_score, score_kind, _), predict_wall, predict_cpu = _measure(
+        lambda: predict_labels_and_scores(model, X_test, with_scores=True))
+    metrics, metrics_wall, metrics_cpu = _measure(
+        lambda: get_classification_metrics(y_test, y_pred, y_score, model.classes_, score_kind, full_metrics=True))
+    return {"model": model_name,
+            "train_size": int(len(y_train)),
+            "test_size": int(len(y_test)),
+            "status": "ok",
+            "accuracy": float(metrics["Accuracy"]),
+            "fit_wall": fit_wall,
+            "fit_cpu": fit_cpu,
+            "predict_wall": predict_wall,
+            "predict_cpu": predict_cpu,
+            "metrics_wall": metrics_wall,
+            "metrics_cpu": metrics_cpu,
+            "peak_rss_mb": get_peak_rss_mb(),
+            "fit_samples_per_s": len(y_train) / fit_wall if fit_wall > 0 else None,
+            "predict_samples_per_s": len(y_test) / predict_wall if predict_wall > 0 else None}
+
+
+def _run_one_worker(conn, *args):
+    try:
+        conn.send(run_one(*args))
+    except Exception as ex:
+        conn.send({"status": f"error: {ex!r}"})
+    finally:
+        conn.close()
+
+
+def run_benchmark(model_names=None, sizes=None, test_size=10000, data_path=MNIST_DATA_PATH, timeout=None, random_state=0, verbose=1):
+    """Lance chaque (modèle, taille) dans un processus neuf pour mesurer un pic de mémoire propre à chaque run."""
+    if model_names is None:
+        model_names = list(get_benchmark_models())
+    if sizes is None:
+        sizes = DEFAULT_SIZES
+    # Téléchargement / conversion unique avant de lancer les processus
+    load_mnist(data_path)
+
+    ctx = multiprocessing.get_context()
+    results = []
+    for train_size in sizes:
+        for model_name in model_names:
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=_run_one_worker, args=(child_conn, model_name, train_size, test_size, data_path, random_state))
+            process.start()
+            child_conn.close()
+            if parent_conn.poll(timeout):
+                try:
+                    row = parent_conn.recv()
+                except EOFError:
+                    row = {"status": f"error: process exited with code {process.exitcode}"}
+            else:
+                process.terminate()
+                row = {"status": f"timeout after {timeout} s"}
+            process.join()
+            parent_conn.close()
+            row.setdefault("model", model_name)
+            row.setdefault("train_size", train_size)
+            results.append(row)
+            if verbose:
+                print(f"{model_name:<22} {train_size:>6} : {row['status']:<10}",
+                      f"fit {row.get('fit_wall', float('nan')):9.3f} s  predict {row.get('predict_wall', float('nan')):9.3f} s",
+                      f"rss {row.get('peak_rss_mb', float('nan')):8.1f} MB  acc {row.get('accuracy', float('nan')):.4f}")
+    return {"meta": {"date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                     "python": platform.python_version(),
+                     "numpy": np.__version__,
+                     "sklearn": sklearn.__version__,
+                     "platform": platform.platform(),
+                     "cpu_count": multiprocessing.cpu_count(),
+                     "test_size": test_size},
+            "results": results}
+
+
+def run_ann_benchmark(n_lists=64, n_probes=(1, 2, 4, 8, 16), n_neighbors=3, train_size=60000, test_size=10000, data_path=MNIST_DATA_PATH, random_state=0, verbose=1):
+    """Compare l'index IVF au KNN exact : perte de précision, rappel des k voisins et gain en temps de prédiction."""
+    X_train, X_test, y_train, y_test = load_mnist(data_path)
+    X_train, y_train = X_train[:train_size], y_train[:train_size]
+    X_test, y_test = X_test[:test_size], y_test[:test_size]
+
+    exact = KNeighborsClassifier(n_neighbors=n_neighbors).fit(X_train, y_train)
+    (_, exact_neighbors), exact_wall, _ = _measure(lambda: exact.kneighbors(X_test))
+    exact_pred = exact.classes_[np.argmax(exact.predict_proba(X_test), axis=1)]
+    exact_acc = float(np.mean(exact_pred == y_test))
+
+    ivf = IVFKNeighborsClassifier(n_neighbors=n_neighbors, n_lists=n_lists, random_state=random_state)
+    _, fit_wall, _ = _measure(lambda: ivf.fit(X_train, y_train))
+    rows = []
+    for n_probe in n_probes:
+        ivf.set_params(n_probe=n_probe)
+        (_, neighbors), predict_wall, _ = _measure(lambda: ivf.kneighbors(X_test))
+        recall = np.mean([len(np.intersect1d(a, b)) for a, b in zip(neighbors, exact_neighbors)]) / n_neighbors
+        accuracy = float(np.mean(ivf.predict(X_test) == y_test))
+        rows.append({"n_lists": n_lists,
+                     "n_probe": n_probe,
+                     "accuracy": accuracy,
+                     "accuracy_loss": exact_acc - accuracy,
+                     "recall": float(recall),
+                     "predict_wall": predict_wall,
+                     "speedup": exact_wall / predict_wall if predict_wall > 0 else None})
+        if verbose:
+            print(f"n_probe {n_probe:>4} : acc {accuracy:.4f} (exact {exact_acc:.4f}, loss {exact_acc - accuracy:+.4f})",
+                  f"recall@{n_neighbors} {recall:.4f}  kneighbors {predict_wall:8.3f} s  x{exact_wall / predict_wall:.1f}")
+    return {"meta": {"date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                     "train_size": int(len(y_train)),
+                     "test_size": int(len(y_test)),
+                     "n_neighbors": n_neighbors,
+                     "exact_accuracy": exact_acc,
+                     "exact_kneighbors_wall": exact_wall,
+                     "ivf_fit_wall": fit_wall},
+            "results": rows}
+
+
+def compare_benchmarks(reference, current, threshold=0.10, metrics=None, min_value=0.05):
+    """Retourne la liste des régressions (augmentation relative > threshold) entre deux résultats.
+
+    Un (modèle, taille) "ok" dans la référence qui est en échec (timeout, erreur) ou absent du résultat
+    courant est une régression sur la métrique "status".
+    """
+    if metrics is None:
+        metrics = COMPARED_METRICS
+    ref_rows = {(row["model"], row["train_size"]): row for row in reference["results"] if row.get("status") == "ok"}
+    current_keys = {(row["model"], row["train_size"]) for row in current["results"]}
+    regressions = [{"model": model, "train_size": train_size, "metric": "status", "reference": "ok", "current": "missing", "change": None}
+                   for model, train_size in ref_rows if (model, train_size) not in current_keys]
+    for row in current["results"]:
+        ref = ref_rows.get((row["model"], row["train_size"]))
+        if ref is None:
+            continue
+        if row.get("status") != "ok":
+            regressions.append({"model": row["model"], "train_size": row["train_size"], "metric": "status",
+                                "reference": "ok", "current": row.get("status"), "change": None})
+            continue
+        for metric in metrics:
+            old, new = ref.get(metric), row.get(metric)
+            # Les valeurs trop petites sont dominées par le bruit de mesure
+            if old is None or new is None or old < min_value:
+                continue
+            change = new / old - 1
+            if change > threshold:
+                regressions.append({"model": row["model"], "train_size": row["train_size"], "metric": metric,
+                                    "reference": old, "current": new, "change": change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de passage à l'échelle des modèles MNIST")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="lance le benchmark et écrit les résultats en JSON")
+    run_parser.add_argument("--models", nargs="+", default=None, choices=list(get_benchmark_models()))
+    run_parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    run_parser.add_argument("--test-size", type=int, default=10000)
+    run_parser.add_argument("--data-path", default=MNIST_DATA_PATH)
+    run_parser.add_argument("--timeout", type=float, default=None, help="durée maximale par (modèle, taille) en secondes")
+    run_parser.add_argument("--output", default="bench_results.json")
+
+    cmp_parser = sub.add_parser("compare", help="compare deux fichiers de résultats, code retour 1 en cas de régression")
+    cmp_parser.add_argument("reference")
+    cmp_parser.add_argument("current")
+    cmp_parser.add_argument("--threshold", type=float, default=0.10, help="augmentation relative tolérée (0.10 = 10 %%)")
+    cmp_parser.add_argument("--metrics", nargs="+", default=COMPARED_METRICS)
+    cmp_parser.add_argument("--min-value", type=float, default=0.05)
+
+    ann_parser = sub.add_parser("ann", help="précision et rappel de l'index IVF par rapport au KNN exact")
+    ann_parser.add_argument("--n-lists", type=int, default=64)
+    ann_parser.add_argument("--n-probes", nargs="+", type=int, default=[1, 2, 4, 8, 16])
+    ann_parser.add_argument("--n-neighbors", type=int, default=3)
+    ann_parser.add_argument("--train-size", type=int, default=60000)
+    ann_parser.add_argument("--test-size", type=int, default=10000)
+    ann_parser.add_argument("--data-path", default=MNIST_DATA_PATH)
+    ann_parser.add_argument("--output", default="ann_results.json")
+
+    args = parser.parse_args(argv)
+    if args.command == "ann":
+        res = run_ann_benchmark(args.n_lists, args.n_probes, n_neighbors=args.n_neighbors, train_size=args.train_size,
+                                test_size=args.test_size, data_path=args.data_path)
+        with open(args.output, "w") as f:
+            json.dump(res, f, indent=2)
+        print("=>", args.output)
+        return 0
+    if args.command == "run":
+        res = run_benchmark(args.models, args.sizes, test_size=args.test_size, data_path=args.data_path, timeout=args.timeout)
+        with open(args.output, "w") as f:
+            json.dump(res, f, indent=2)
+        print("=>", args.output)
+        return 0
+
+    with open(args.reference) as f:
+        reference = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare_benchmarks(reference, current, threshold=args.threshold, metrics=args.metrics, min_value=args.min_value)
+    for reg in regressions:
+        if reg["change"] is None:
+            print(f"REGRESSION {reg['model']:<22} {reg['train_size']:>6} {reg['metric']:<14}", f"{reg['reference']} => {reg['current']}")
+            continue
+        print(f"REGRESSION {reg['model']:<22} {reg['train_size']:>6} {reg['metric']:<14}",
+              f"{reg['reference']:10.3f} => {reg['current']:10.3f} (+{reg['change']:.1%})")
+    if not regressions:
+        print("No regression above", f"{args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
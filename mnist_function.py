@@ -1,12 +1,19 @@
 
 import numpy as np
+from scipy import sparse
 import matplotlib.pyplot as plt
 from sklearn import svm
 from sklearn.decomposition import PCA
-from sklearn.model_selection import GridSearchCV
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.model_selection import GridSearchCV, ParameterGrid, check_cv
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingGridSearchCV
 from sklearn.pipeline import Pipeline
 from sklearn.neighbors import KNeighborsClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import GaussianNB, MultinomialNB, BernoulliNB
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics.pairwise import euclidean_distances
 from sklearn.pipeline import make_pipeline
 try:
     from sklearn.utils._testing import ignore_warnings
@@ -15,16 +22,816 @@ except ImportError:
 import warnings
 from sklearn.exceptions import ConvergenceWarning
 import time
-from collections import defaultdict
+import os
+import sys
+import logging
+try:
+    import resource
+except ImportError:
+    # Module indisponible sous Windows : pas de mesure du pic de mémoire résidente
+    resource = None
+import tracemalloc
+from contextlib import contextmanager
+import hashlib
+import pickle
+import json
+import shutil
+import queue
+import threading
+import multiprocessing
+from multiprocessing import connection as mp_connection
+from multiprocessing.managers import BaseManager
+import uuid
+import ipaddress
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.base import BaseEstimator, ClassifierMixin, TransformerMixin, clone, is_classifier
 from sklearn.svm import LinearSVC
 
 
+# ----------------------------------------------------------------------------------
+#                        DATA : MNIST uint8 memory-mapped
+# ----------------------------------------------------------------------------------
+MNIST_DATA_PATH = "mnist_data"
+MNIST_X_FILE = "mnist_784_X_uint8.npy"
+MNIST_Y_FILE = "mnist_784_y_uint8.npy"
+
+
+def save_mnist_uint8(X, y, path=MNIST_DATA_PATH):
+    """Enregistre les pixels et les labels au format uint8 (.npy) pour pouvoir les mapper en mémoire."""
+    os.makedirs(path, exist_ok=True)
+    for file_name, data in ((MNIST_X_FILE, X), (MNIST_Y_FILE, y)):
+        if hasattr(data, "to_numpy"):
+            data = data.to_numpy()
+        data = np.asarray(data).astype(np.uint8)
+        file_path = os.path.join(path, file_name)
+        # Écriture dans un fichier temporaire pour ne jamais laisser un fichier tronqué
+        tmp_path = f"{file_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, data)
+        os.replace(tmp_path, file_path)
+
+
+def load_mnist(path=MNIST_DATA_PATH, train_size=60000, verbose=0):
+    """Retourne X_train, X_test, y_train, y_test en vues (sans copie) sur les fichiers uint8 mappés en mémoire.
+
+    Au premier appel, le jeu mnist_784 est téléchargé avec fetch_openml puis converti en uint8.
+    """
+    X_path = os.path.join(path, MNIST_X_FILE)
+    y_path = os.path.join(path, MNIST_Y_FILE)
+    if not (os.path.exists(X_path) and os.path.exists(y_path)):
+        from sklearn.datasets import fetch_openml
+        if verbose:
+            print("fetch_openml('mnist_784') => ", path)
+        mnist = fetch_openml('mnist_784', version=1, as_frame=False)
+        save_mnist_uint8(mnist["data"], mnist["target"], path=path)
+
+    X = np.load(X_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")
+    if verbose:
+        print("X:", X.shape, X.dtype, "y:", y.shape, y.dtype)
+    return X[:train_size], X[train_size:], y[:train_size], y[train_size:]
+
+
+# Politique de type des données à l'entrée des estimateurs : (dtype, facteur d'échelle)
+# Le stockage reste en uint8 ; la conversion est faite une seule fois et partagée entre les modèles
+DTYPE_POLICIES = {"uint8": (None, None),
+                  "float32": (np.float32, 1 / 255),
+                  "float64": (np.float64, 1 / 255),
+                  "csr": (np.float32, 1 / 255)}
+# Politiques qui produisent une matrice sparse (CSR) : ~80 % des pixels MNIST sont nuls
+SPARSE_DTYPE_POLICIES = ("csr",)
+MODEL_INPUT_CACHE_SIZE = 4
+SPARSE_CONVERSION_BATCH_SIZE = 10000
+_model_input_cache = OrderedDict()
+
+
+def as_model_input(X, dtype_policy=None, cache=True):
+    """Convertit les pixels bruts (0-255) X selon dtype_policy ('uint8' : inchangé, 'float32' / 'float64' :
+    pixels / 255 dans [0, 1], 'csr' : matrice sparse CSR float32 / 255).
+
+    Si cache, le résultat (en lecture seule) est mis en cache par empreinte des données : les appels suivants
+    sur les mêmes données ne refont pas la copie.
+    """
+    if dtype_policy is None or X is None or hasattr(X, "tocsr"):
+        return X
+    if dtype_policy not in DTYPE_POLICIES:
+        raise ValueError(f"Unknown dtype policy : {dtype_policy}, expected one of {list(DTYPE_POLICIES)}")
+    dtype, scale = DTYPE_POLICIES[dtype_policy]
+    if dtype is None:
+        return X
+    X = X.to_numpy() if hasattr(X, "to_numpy") else np.asarray(X)
+    key = (get_data_fingerprint(X), dtype_policy) if cache else None
+    converted = _lru_get(_model_input_cache, key) if cache else None
+    if converted is None:
+        if dtype_policy in SPARSE_DTYPE_POLICIES:
+            # Conversion par blocs depuis le uint8 : pas de copie dense en float
+            blocks = []
+            for start in range(0, X.shape[0], SPARSE_CONVERSION_BATCH_SIZE):
+                block = sparse.csr_matrix(np.asarray(X[start:start + SPARSE_CONVERSION_BATCH_SIZE])).astype(dtype)
+                block.data *= dtype(scale)
+                blocks.append(block)
+            converted = sparse.vstack(blocks, format="csr")
+        else:
+            # Conversion et mise à l'échelle en un seul passage
+            converted = np.multiply(X, scale, dtype=dtype)
+            converted.setflags(write=False)
+        if cache:
+            _lru_put(_model_input_cache, key, converted, MODEL_INPUT_CACHE_SIZE)
+    return converted
+
+
+# En dessous de ce nombre de lignes (ex : batchs de prédiction), DtypePolicyTransformer ne met pas la conversion en cache
+MODEL_INPUT_CACHE_MIN_ROWS = 10000
+
+
+class DtypePolicyTransformer(BaseEstimator, TransformerMixin):
+    """Étape sans état qui applique dtype_policy (as_model_input) aux pixels bruts.
+
+    Placée en tête des modèles entraînés avec une politique de type, elle leur permet de prédire
+    directement sur des pixels 0-255 ; les conversions des gros jeux de données restent partagées (cache).
+    """
+
+    def __init__(self, dtype_policy="float32"):
+        self.dtype_policy = dtype_policy
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        n_samples = X.shape[0] if hasattr(X, "shape") else len(X)
+        return as_model_input(X, self.dtype_policy, cache=n_samples >= MODEL_INPUT_CACHE_MIN_ROWS)
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+
+def get_model_dtype_policy(model, dtype_policy, param_grid=None):
+    """Politique réellement appliquée à model : en 'csr', repli dense ('float32', mêmes valeurs) si model
+    (ou l'un des candidats de param_grid) ne supporte pas le sparse."""
+    if dtype_policy in SPARSE_DTYPE_POLICIES and not supports_sparse(model, param_grid):
+        return "float32"
+    return dtype_policy
+
+
+def with_dtype_policy(model, dtype_policy, param_grid=None):
+    """Place un DtypePolicyTransformer en tête de model (en première étape si model est un Pipeline, pour garder
+    les noms des paramètres) ; model est retourné tel quel si la politique ne convertit rien.
+    param_grid : grille qui sera explorée avec model, prise en compte pour le choix du sparse."""
+    if dtype_policy is None:
+        return model
+    if dtype_policy not in DTYPE_POLICIES:
+        raise ValueError(f"Unknown dtype policy : {dtype_policy}, expected one of {list(DTYPE_POLICIES)}")
+    if DTYPE_POLICIES[dtype_policy][0] is None:
+        return model
+    step = DtypePolicyTransformer(get_model_dtype_policy(model, dtype_policy, param_grid))
+    if isinstance(model, Pipeline):
+        return Pipeline([("dtypepolicytransformer", step)] + list(model.steps), memory=model.memory, verbose=model.verbose)
+    return make_pipeline(step, model)
+
+
+def data_size_mb(X):
+    """Taille en mémoire (MB) d'un tableau, d'un DataFrame ou d'une matrice sparse."""
+    if X is None:
+        return 0.0
+    if hasattr(X, "tocsr") and hasattr(X, "indptr"):
+        return (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1024**2
+    if hasattr(X, "memory_usage"):
+        usage = X.memory_usage(deep=True)
+        return float(usage.sum() if hasattr(usage, "sum") else usage) / 1024**2
+    return np.asarray(X).nbytes / 1024**2
+
+
+# ----------------------------------------------------------------------------------
+#                        MODELS : PCA partagée entre les candidats
+# ----------------------------------------------------------------------------------
+# PCA déjà entraînées et projections déjà calculées, partagées entre les candidats d'une recherche
+PREFIX_PCA_CACHE_SIZE = 8
+PREFIX_PROJECTION_CACHE_SIZE = 16
+_prefix_pca_cache = OrderedDict()
+_prefix_projection_cache = OrderedDict()
+
+
+def _lru_get(cache, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _lru_put(cache, key, value, max_size):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+class PrefixPCA(BaseEstimator, TransformerMixin):
+    """PCA entraînée une seule fois avec max_components composantes pour un jeu de données donné.
+
+    Les n_components premières composantes d'une PCA sont identiques quel que soit le nombre
+    de composantes demandé : chaque candidat de la grille pca__n_components réutilise donc la
+    même décomposition (et la même projection) tronquée, au lieu de refaire la PCA à chaque fit.
+    """
+
+    def __init__(self, n_components=None, max_components=None, whiten=False, svd_solver='auto', random_state=None):
+        self.n_components = n_components
+        self.max_components = max_components
+        self.whiten = whiten
+        self.svd_solver = svd_solver
+        self.random_state = random_state
+
+    def _pca_key(self, X):
+        max_components = self.max_components if self.max_components is not None else self.n_components
+        return (get_data_fingerprint(X), max_components, self.whiten, self.svd_solver, self.random_state)
+
+    def fit(self, X, y=None):
+        key = self._pca_key(X)
+        pca = _lru_get(_prefix_pca_cache, key)
+        if pca is None:
+            pca = PCA(n_components=key[1], whiten=self.whiten, svd_solver=self.svd_solver, random_state=self.random_state).fit(X)
+            _lru_put(_prefix_pca_cache, key, pca, PREFIX_PCA_CACHE_SIZE)
+        n_components = self.n_components if self.n_components is not None else pca.n_components_
+        if n_components > pca.n_components_:
+            raise ValueError(f"n_components={n_components} > max_components={pca.n_components_}")
+        self.pca_key_ = key
+        self.pca_ = pca
+        self.n_components_ = n_components
+        self.mean_ = pca.mean_
+        self.components_ = pca.components_[:n_components]
+        self.explained_variance_ = pca.explained_variance_[:n_components]
+        self.explained_variance_ratio_ = pca.explained_variance_ratio_[:n_components]
+        self.n_features_in_ = pca.n_features_in_
+        return self
+
+    def transform(self, X):
+        # Projection sur toutes les composantes calculée une fois, puis tronquée
+        key = (self.pca_key_, get_data_fingerprint(X))
+        projection = _lru_get(_prefix_projection_cache, key)
+        if projection is None:
+            projection = self.pca_.transform(X)
+            projection.setflags(write=False)
+            _lru_put(_prefix_projection_cache, key, projection, PREFIX_PROJECTION_CACHE_SIZE)
+        return projection[:, :self.n_components_]
+
+    def fit_transform(self, X, y=None):
+        return self.fit(X, y).transform(X)
+
+
 # ----------------------------------------------------------------------------------
 #                        MODELS : GridSearchCV
 # ----------------------------------------------------------------------------------
 
+class _PrecomputedSearchCV(BaseEstimator):
+    """Base des recherches d'hyperparamètres qui calculent elles-mêmes leurs scores de validation croisée.
+
+    Expose les mêmes attributs que GridSearchCV (cv_results_, best_params_, best_score_,
+    best_estimator_...) pour rester utilisable avec display_scores et fit_and_test_models.
+    """
+
+    def _store_results(self, candidate_params, test_scores, fit_times, score_times, X, y):
+        test_scores = np.asarray(test_scores, dtype=float)
+        fit_times = np.asarray(fit_times, dtype=float)
+        score_times = np.asarray(score_times, dtype=float)
+        n_splits = test_scores.shape[1]
+        results = {"params": candidate_params}
+        for name in sorted({name for params in candidate_params for name in params}):
+            results["param_"+name] = np.array([params.get(name) for params in candidate_params], dtype=object)
+        for i in range(n_splits):
+            results[f"split{i}_test_score"] = test_scores[:, i]
+        results["mean_test_score"] = test_scores.mean(axis=1)
+        results["std_test_score"] = test_scores.std(axis=1)
+        results["rank_test_score"] = rankdata(-np.nan_to_num(results["mean_test_score"], nan=-np.inf), method="min").astype(np.int32)
+        results["mean_fit_time"] = fit_times.mean(axis=1)
+        results["std_fit_time"] = fit_times.std(axis=1)
+        results["mean_score_time"] = score_times.mean(axis=1)
+        results["std_score_time"] = score_times.std(axis=1)
+
+        self.cv_results_ = results
+        self.n_splits_ = n_splits
+        # Les candidats en échec (score NaN) ne peuvent pas être retenus
+        self.best_index_ = int(np.argmax(np.nan_to_num(results["mean_test_score"], nan=-np.inf)))
+        self.best_score_ = results["mean_test_score"][self.best_index_]
+        self.best_params_ = candidate_params[self.best_index_]
+        if self.refit:
+            t0 = time.time()
+            self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_).fit(X, y)
+            self.refit_time_ = time.time() - t0
+        return self
+
+    @property
+    def classes_(self):
+        return self.best_estimator_.classes_
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
+
+    def decision_function(self, X):
+        return self.best_estimator_.decision_function(X)
+
+    def score(self, X, y):
+        return self.best_estimator_.score(X, y)
+
+
+class KNeighborsGridSearchCV(_PrecomputedSearchCV):
+    """Recherche sur n_neighbors (et weights) qui calcule les voisins une seule fois par (fold, autres paramètres).
+
+    Les plus proches voisins sont calculés jusqu'au plus grand k de la grille ; la table de voisins
+    triée permet ensuite de scorer tous les k (vote cumulé) sans recalculer de distances.
+    """
+
+    def __init__(self, estimator, param_grid, cv=4, refit=True, verbose=0):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.refit = refit
+        self.verbose = verbose
+
+    def _knn_prefix(self):
+        if isinstance(self.estimator, Pipeline):
+            return self.estimator.steps[-1][0]+"__"
+        return ""
+
+    def fit(self, X, y):
+        prefix = self._knn_prefix()
+        k_key, weights_key = prefix+"n_neighbors", prefix+"weights"
+        candidate_params = list(ParameterGrid(self.param_grid))
+
+        # Regroupement des candidats qui partagent le même graphe de voisins
+        groups = defaultdict(list)
+        for i, params in enumerate(candidate_params):
+            graph_params = {key: val for key, val in params.items() if key not in (k_key, weights_key)}
+            groups[repr(sorted(graph_params.items(), key=lambda kv: kv[0]))].append(i)
+
+        X_arr = X.to_numpy() if hasattr(X, "to_numpy") else X
+        y_arr = np.asarray(y)
+        classes, y_enc = np.unique(y_arr, return_inverse=True)
+        splits = list(check_cv(self.cv, y_arr, classifier=True).split(X_arr, y_arr))
+
+        test_scores = np.zeros((len(candidate_params), len(splits)))
+        fit_times = np.zeros_like(test_scores)
+        score_times = np.zeros_like(test_scores)
+        for indexes in groups.values():
+            graph_params = {key: val for key, val in candidate_params[indexes[0]].items() if key not in (k_key, weights_key)}
+            k_values = [candidate_params[i].get(k_key, self.estimator.get_params()[k_key]) for i in indexes]
+            max_k = max(k_values)
+            for fold, (train, test) in enumerate(splits):
+                t0 = time.time()
+                model = clone(self.estimator).set_params(**graph_params)
+                model.set_params(**{k_key: max_k}).fit(X_arr[train], y_arr[train])
+                knn = model
+                X_test = X_arr[test]
+                if isinstance(model, Pipeline):
+                    knn = model.steps[-1][1]
+                    if len(model.steps) > 1:
+                        X_test = model[:-1].transform(X_test)
+                distances, neighbors = knn.kneighbors(X_test, n_neighbors=max_k)
+                t_graph = (time.time() - t0) / len(indexes)
+
+                t0 = time.time()
+                accuracies = self._score_all_k(distances, y_enc[train][neighbors], y_enc[test], len(classes), [candidate_params[i] for i in indexes], k_key, weights_key)
+                t_score = (time.time() - t0) / len(indexes)
+                for i, acc in zip(indexes, accuracies):
+                    test_scores[i, fold] = acc
+                    fit_times[i, fold] = t_graph
+                    score_times[i, fold] = t_score
+            if self.verbose:
+                print(graph_params, "max k:", max_k, "DONE")
+        return self._store_results(candidate_params, test_scores, fit_times, score_times, X, y)
+
+    def _score_all_k(self, distances, neighbor_labels, y_test, n_classes, params_list, k_key, weights_key):
+        n_test, max_k = neighbor_labels.shape
+        rows = np.arange(n_test)
+        weights_list = {params.get(weights_key, 'uniform') for params in params_list}
+        accuracy = {}
+        for weights in weights_list:
+            if weights == 'uniform':
+                w = np.ones(distances.shape)
+            elif weights == 'distance':
+                # Comme KNeighborsClassifier : un voisin à distance nulle l'emporte sur tous les autres
+                with np.errstate(divide="ignore"):
+                    w = 1.0 / distances
+                zero_rows = np.isinf(w).any(axis=1)
+                w[zero_rows] = np.isinf(w[zero_rows])
+            else:
+                raise ValueError(f"Unsupported weights for KNeighborsGridSearchCV : {weights}")
+            # Vote cumulé : les comptes pour k voisins sont ceux pour k-1 plus le k-ième voisin
+            counts = np.zeros((n_test, n_classes))
+            for k in range(1, max_k+1):
+                counts[rows, neighbor_labels[:, k-1]] += w[:, k-1]
+                accuracy[(weights, k)] = np.mean(np.argmax(counts, axis=1) == y_test)
+        return [accuracy[(params.get(weights_key, 'uniform'), params[k_key])] for params in params_list]
+
+
+# Adresse de la file de tâches des recherches distribuées ; ("0.0.0.0", port) pour accepter des workers d'autres machines
+GRID_QUEUE_ADDRESS = ("127.0.0.1", 0)
+# Clé partagée de la file ; None : clé aléatoire générée à chaque recherche (affichée pour les workers distants).
+# Le manager désérialise (pickle) ce qu'envoie un pair authentifié : la clé ne doit jamais être publique
+GRID_QUEUE_AUTHKEY = None
+# Ancienne clé par défaut, publiée dans le code : refusée sur une adresse accessible depuis le réseau
+GRID_QUEUE_PUBLIC_AUTHKEY = b"mnist-grid"
+GRID_LEASE_SECONDS = 60
+_grid_coordinator = None
+
+
+class GridTaskCoordinator:
+    """File de tâches (candidat, fold) d'une recherche distribuée, hébergée par le serveur GridQueueManager.
+
+    Chaque tâche distribuée est louée au worker pour lease_seconds secondes (renouvelées par ses
+    battements de cœur) ; une location expirée (worker perdu) remet la tâche dans la file, au plus
+    max_retries fois.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stopped = False
+        self.job_id = None
+        self.last_seen = time.time()
+
+    def submit_job(self, job_id, job, tasks, lease_seconds=GRID_LEASE_SECONDS, max_retries=3):
+        with self.lock:
+            self.job_id, self.job, self.tasks = job_id, job, list(tasks)
+            self.lease_seconds, self.max_retries = lease_seconds, max_retries
+            self.pending = list(range(len(self.tasks)))
+            self.leases = {}
+            self.attempts = [0] * len(self.tasks)
+            self.results = {}
+            self.errors = {}
+            self.last_seen = time.time()
+
+    def get_job(self, job_id):
+        with self.lock:
+            return self.job if job_id == self.job_id else None
+
+    def _requeue_expired(self):
+        now = time.time()
+        for task_id, (worker_id, deadline) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[task_id]
+                self._retry(task_id, f"lease expired (worker {worker_id})")
+
+    def _retry(self, task_id, error):
+        if self.attempts[task_id] < self.max_retries:
+            self.pending.append(task_id)
+        else:
+            self.errors[task_id] = error
+
+    def get_task(self, worker_id):
+        """Retourne ("stop",), None (rien à faire pour l'instant) ou (job_id, task_id, params, fold)."""
+        with self.lock:
+            self.last_seen = time.time()
+            if self.stopped:
+                return ("stop",)
+            if self.job_id is None:
+                return None
+            self._requeue_expired()
+            if not self.pending:
+                return None
+            task_id = self.pending.pop(0)
+            self.attempts[task_id] += 1
+            self.leases[task_id] = (worker_id, time.time() + self.lease_seconds)
+            params, fold = self.tasks[task_id]
+            return (self.job_id, task_id, params, fold)
+
+    def renew(self, job_id, task_id, worker_id):
+        with self.lock:
+            self.last_seen = time.time()
+            if job_id == self.job_id and task_id in self.leases:
+                self.leases[task_id] = (worker_id, time.time() + self.lease_seconds)
+
+    def complete(self, job_id, task_id, result):
+        with self.lock:
+            self.last_seen = time.time()
+            if job_id != self.job_id or task_id in self.results:
+                return
+            self.leases.pop(task_id, None)
+            self.errors.pop(task_id, None)
+            self.results[task_id] = result
+
+    def fail(self, job_id, task_id, error):
+        with self.lock:
+            self.last_seen = time.time()
+            if job_id != self.job_id or task_id in self.results or self.leases.pop(task_id, None) is None:
+                return
+            self._retry(task_id, error)
+
+    def status(self):
+        with self.lock:
+            if self.job_id is None:
+                return {"done": False}
+            self._requeue_expired()
+            n_done = len(self.results) + len(self.errors)
+            return {"tasks": len(self.tasks), "done tasks": len(self.results), "failed tasks": len(self.errors),
+                    "pending": len(self.pending), "leased": len(self.leases), "done": n_done == len(self.tasks),
+                    "idle seconde": time.time() - self.last_seen}
+
+    def abort(self, error):
+        """Fait échouer toutes les tâches pas encore terminées (aucun worker pour les traiter)."""
+        with self.lock:
+            for task_id in self.pending + list(self.leases):
+                self.errors[task_id] = error
+            self.pending, self.leases = [], {}
+
+    def get_results(self):
+        with self.lock:
+            return dict(self.results), dict(self.errors)
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+
+
+def _get_grid_coordinator():
+    # Exécuté dans le processus serveur du manager : un coordinateur unique
+    global _grid_coordinator
+    if _grid_coordinator is None:
+        _grid_coordinator = GridTaskCoordinator()
+    return _grid_coordinator
+
+
+class GridQueueManager(BaseManager):
+    pass
+
+
+GridQueueManager.register("get_coordinator", callable=_get_grid_coordinator)
+
+
+def _connect_address(address):
+    host, port = address
+    return ("127.0.0.1" if host in ("", "0.0.0.0") else host, port)
+
+
+def _is_loopback(host):
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def run_grid_worker(address, authkey, worker_id=None, poll_seconds=0.2, verbose=0):
+    """Boucle d'un worker : récupère des tâches (candidat, fold), entraîne, score et renvoie le résultat.
+
+    S'arrête quand le coordinateur le demande ou n'est plus joignable. Utilisable sur une autre machine
+    (voir mnist_grid_worker.py) avec la clé affichée par le coordinateur.
+    """
+    if worker_id is None:
+        worker_id = f"{os.uname().nodename if hasattr(os, 'uname') else 'host'}-{os.getpid()}"
+    manager = GridQueueManager(address=_connect_address(address), authkey=authkey)
+    manager.connect()
+    coordinator = manager.get_coordinator()
+    jobs = {}
+    n_tasks = 0
+    while True:
+        try:
+            task = coordinator.get_task(worker_id)
+        except (EOFError, OSError):
+            break
+        if task is None:
+            time.sleep(poll_seconds)
+            continue
+        if task[0] == "stop":
+            break
+        job_id, task_id, params, fold = task
+        if job_id not in jobs:
+            jobs = {job_id: coordinator.get_job(job_id)}
+        estimator, X, y, splits, scoring, lease_seconds = jobs[job_id]
+
+        # Battements de cœur pendant l'entraînement : la tâche n'est pas redistribuée tant que le worker vit
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(lease_seconds / 4):
+                try:
+                    coordinator.renew(job_id, task_id, worker_id)
+                except (EOFError, OSError):
+                    return
+
+        thread = threading.Thread(target=heartbeat, daemon=True)
+        thread.start()
+        try:
+            train, test = splits[fold]
+            t0 = time.time()
+            model = clone(estimator).set_params(**params).fit(X[train], y[train])
+            fit_time = time.time() - t0
+            t0 = time.time()
+            score = check_scoring(model, scoring)(model, X[test], y[test])
+            coordinator.complete(job_id, task_id, (float(score), fit_time, time.time() - t0))
+            n_tasks += 1
+        except (EOFError, OSError):
+            break
+        except Exception as ex:
+            try:
+                coordinator.fail(job_id, task_id, repr(ex))
+            except (EOFError, OSError):
+                break
+        finally:
+            done.set()
+        if verbose:
+            print(worker_id, "task", task_id, params, "fold", fold, "DONE")
+    return n_tasks
+
+
+class DistributedGridSearchCV(_PrecomputedSearchCV):
+    """Recherche sur grille dont les tâches (candidat, fold) sont distribuées par une file (socket, GridQueueManager)
+    à n_local_workers processus locaux et à tous les workers distants connectés (mnist_grid_worker.py).
+
+    Les tâches perdues (worker arrêté) sont relancées jusqu'à max_retries fois ; un candidat dont une tâche
+    échoue définitivement a un score NaN (comme error_score=np.nan de GridSearchCV).
+    Si aucun worker local n'est vivant et qu'aucun worker ne s'est manifesté depuis lease_seconds secondes,
+    ou au-delà de timeout secondes, les tâches restantes échouent au lieu d'attendre indéfiniment.
+    """
+
+    def __init__(self, estimator, param_grid, cv=4, scoring=None, refit=True, verbose=0, n_local_workers=4, address=None,
+                 authkey=None, lease_seconds=GRID_LEASE_SECONDS, max_retries=3, poll_seconds=0.2, timeout=None):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.refit = refit
+        self.verbose = verbose
+        self.n_local_workers = n_local_workers
+        self.address = address
+        self.authkey = authkey
+        self.lease_seconds = lease_seconds
+        self.max_retries = max_retries
+        self.poll_seconds = poll_seconds
+        self.timeout = timeout
+
+    def fit(self, X, y):
+        candidate_params = list(ParameterGrid(self.param_grid))
+        X_arr = X.to_numpy() if hasattr(X, "to_numpy") else X
+        y_arr = np.asarray(y)
+        splits = list(check_cv(self.cv, y_arr, classifier=is_classifier(self.estimator)).split(X_arr, y_arr))
+        tasks = [(params, fold) for params in candidate_params for fold in range(len(splits))]
+        address = self.address or GRID_QUEUE_ADDRESS
+        authkey = self.authkey or GRID_QUEUE_AUTHKEY or os.urandom(16).hex().encode()
+        public = not _is_loopback(address[0])
+        if public and authkey == GRID_QUEUE_PUBLIC_AUTHKEY:
+            raise ValueError(f"The default authkey is public : refusing to listen on {address[0]}, use a secret authkey")
+
+        manager = GridQueueManager(address=address, authkey=authkey)
+        manager.start()
+        workers = []
+        try:
+            coordinator = manager.get_coordinator()
+            coordinator.submit_job(uuid.uuid4().hex, (self.estimator, X_arr, y_arr, splits, self.scoring, self.lease_seconds),
+                                   tasks, lease_seconds=self.lease_seconds, max_retries=self.max_retries)
+            if self.verbose or public:
+                # Clé à passer aux workers distants : mnist_grid_worker.py --authkey ...
+                print("Grid queue on", manager.address, "authkey", authkey.decode(errors="replace"), ":", len(tasks), "tasks")
+            ctx = multiprocessing.get_context()
+            for i in range(self.n_local_workers or 0):
+                worker = ctx.Process(target=run_grid_worker, args=(manager.address, authkey, f"local-{i}"), daemon=True)
+                worker.start()
+                workers.append(worker)
+            start = time.time()
+            while True:
+                status = coordinator.status()
+                if status["done"]:
+                    break
+                if self.timeout is not None and time.time() - start > self.timeout:
+                    coordinator.abort(f"search timeout after {self.timeout} s")
+                elif not any(worker.is_alive() for worker in workers) and status["idle seconde"] > self.lease_seconds:
+                    # Plus aucun worker : les tâches remises dans la file ne seraient jamais reprises
+                    coordinator.abort(f"no worker alive for {self.lease_seconds} s")
+                time.sleep(self.poll_seconds)
+            results, errors = coordinator.get_results()
+            coordinator.stop()
+        finally:
+            for worker in workers:
+                worker.join(timeout=10)
+                if worker.is_alive():
+                    worker.terminate()
+            manager.shutdown()
+
+        n_splits = len(splits)
+        test_scores = np.full((len(candidate_params), n_splits), np.nan)
+        fit_times = np.zeros_like(test_scores)
+        score_times = np.zeros_like(test_scores)
+        for task_id, (score, fit_time, score_time) in results.items():
+            test_scores[task_id // n_splits, task_id % n_splits] = score
+            fit_times[task_id // n_splits, task_id % n_splits] = fit_time
+            score_times[task_id // n_splits, task_id % n_splits] = score_time
+        self.task_errors_ = errors
+        if errors and self.verbose:
+            print(len(errors), "failed tasks :", list(errors.values())[:3])
+        return self._store_results(candidate_params, test_scores, fit_times, score_times, X, y)
+
+
+
+# Valeurs de C balayées par défaut par le mode search="path" de classifier_logistic_grid
+LOGISTIC_PATH_C = np.logspace(-3, 3, 7)
+
+
+class LogisticPathSearchCV(_PrecomputedSearchCV):
+    """Recherche sur C d'une régression logistique par chemin de régularisation, fold par fold.
+
+    Pour chaque (fold, autres paramètres), C est parcouru de la plus forte à la plus faible régularisation
+    et chaque résolution repart des coefficients de la précédente (warm_start) au lieu de repartir de zéro.
+    L'estimateur peut être une LogisticRegression, un OneVsRestClassifier / OneVsOneClassifier de
+    LogisticRegression (estimator__C), ou un Pipeline terminé par l'un d'eux ; les étapes de
+    prétraitement du pipeline ne sont ajustées qu'une fois par fold.
+    Le warm start n'a pas d'effet avec le solveur liblinear (chaque C est alors résolu de zéro).
+    """
+
+    def __init__(self, estimator, param_grid, cv=4, scoring=None, refit=True, verbose=0):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.scoring = scoring
+        self.refit = refit
+        self.verbose = verbose
+
+    def _c_key(self):
+        prefix, model = "", self.estimator
+        if isinstance(model, Pipeline):
+            prefix, model = model.steps[-1][0]+"__", model.steps[-1][1]
+        if isinstance(model, (OneVsRestClassifier, OneVsOneClassifier)):
+            return prefix, "estimator__C"
+        return prefix, "C"
+
+    def fit(self, X, y):
+        prefix, inner_c_key = self._c_key()
+        c_key = prefix+inner_c_key
+        candidate_params = list(ParameterGrid(self.param_grid))
+
+        # Regroupement des candidats qui ne diffèrent que par C : un chemin de régularisation par groupe
+        groups = defaultdict(list)
+        for i, params in enumerate(candidate_params):
+            other_params = {key: val for key, val in params.items() if key != c_key}
+            groups[repr(sorted(other_params.items(), key=lambda kv: kv[0]))].append(i)
+
+        X_arr = X.to_numpy() if hasattr(X, "to_numpy") else X
+        y_arr = np.asarray(y)
+        splits = list(check_cv(self.cv, y_arr, classifier=True).split(X_arr, y_arr))
+
+        test_scores = np.full((len(candidate_params), len(splits)), np.nan)
+        fit_times = np.zeros_like(test_scores)
+        score_times = np.zeros_like(test_scores)
+        for indexes in groups.values():
+            other_params = {key: val for key, val in candidate_params[indexes[0]].items() if key != c_key}
+            # Du plus régularisé (C petit) au moins régularisé
+            indexes = sorted(indexes, key=lambda i: candidate_params[i].get(c_key, self.estimator.get_params()[c_key]))
+            for fold, (train, test) in enumerate(splits):
+                t0 = time.time()
+                model = clone(self.estimator).set_params(**other_params)
+                X_train, X_test = X_arr[train], X_arr[test]
+                if isinstance(model, Pipeline):
+                    if len(model.steps) > 1:
+                        X_train = model[:-1].fit_transform(X_train, y_arr[train])
+                        X_test = model[:-1].transform(X_test)
+                    model = model.steps[-1][1]
+                t_transform = (time.time() - t0) / len(indexes)
+                scorer = check_scoring(model, self.scoring)
+                for step, i in enumerate(indexes):
+                    C = candidate_params[i].get(c_key, self.estimator.get_params()[c_key])
+                    t0 = time.time()
+                    try:
+                        self._fit_warm(model, X_train, y_arr[train], inner_c_key, C, warm=step > 0)
+                    except Exception as ex:
+                        # Un échec interrompt le chemin : les C suivants de ce fold restent NaN
+                        print(candidate_params[i], "FAILED : ", ex)
+                        break
+                    fit_times[i, fold] = time.time() - t0 + t_transform
+                    t0 = time.time()
+                    test_scores[i, fold] = scorer(model, X_test, y_arr[test])
+                    score_times[i, fold] = time.time() - t0
+            if self.verbose:
+                print(other_params, "C path:", len(indexes), "DONE")
+        return self._store_results(candidate_params, test_scores, fit_times, score_times, X, y)
+
+    def _fit_warm(self, model, X, y, c_key, C, warm):
+        """Ajuste model pour C ; si warm, les LogisticRegression déjà ajustées repartent de leurs coefficients."""
+        model.set_params(**{c_key: C})
+        if not warm:
+            if isinstance(model, LogisticRegression):
+                model.set_params(warm_start=True)
+            else:
+                model.set_params(estimator__warm_start=True)
+            return model.fit(X, y)
+        if isinstance(model, LogisticRegression):
+            return model.fit(X, y)
+        # OneVsRest / OneVsOne.fit clonent leur estimateur : les classifieurs binaires sont réajustés sur place
+        if isinstance(model, OneVsRestClassifier):
+            Y = model.label_binarizer_.transform(y).tocsc()
+            targets = [(slice(None), col.toarray().ravel()) for col in Y.T]
+        else:
+            targets = []
+            for a in range(len(model.classes_)):
+                for b in range(a+1, len(model.classes_)):
+                    cond = (y == model.classes_[a]) | (y == model.classes_[b])
+                    targets.append((cond, (y[cond] == model.classes_[b]).astype(int)))
+        for estimator, (rows, target) in zip(model.estimators_, targets):
+            # Les classes constantes sont représentées par un prédicteur constant, sans coefficients
+            if isinstance(estimator, LogisticRegression):
+                estimator.set_params(C=C).fit(X[rows], target)
+        return model
+
+
 @ignore_warnings(category=UserWarning)
-def classifier_knn_grid(X_train, y_train, verbose=False, grid_params=None):
+def classifier_knn_grid(X_train, y_train, verbose=False, grid_params=None, search="grid", dtype_policy=None):
     if verbose: print("kneighborsclassifier", end="")
     if grid_params is None:
         grid_params = { 'kneighborsclassifier__n_neighbors': np.arange(1, 20),
@@ -35,54 +842,167 @@ def classifier_knn_grid(X_train, y_train, verbose=False, grid_params=None):
                             'kneighborsclassifier__n_jobs' : [None],
                             'kneighborsclassifier__weights' : ['uniform']
                             }
-    grid_pipeline = make_pipeline( KNeighborsClassifier())
-    grid = GridSearchCV(grid_pipeline,param_grid=grid_params, cv=4)
+    # La conversion des pixels fait partie du modèle : il prédit ensuite directement sur des pixels 0-255
+    grid_pipeline = with_dtype_policy(make_pipeline( KNeighborsClassifier()), dtype_policy, grid_params)
+    if search == "neighbors":
+        # Les voisins sont calculés une seule fois par (fold, p) et réutilisés pour tous les n_neighbors
+        grid = KNeighborsGridSearchCV(grid_pipeline, param_grid=grid_params, cv=4)
+    else:
+        grid = GridSearchCV(grid_pipeline,param_grid=grid_params, cv=4)
     grid.fit(X_train, y_train)
     if verbose: print("             DONE")
     return grid
 
 
 @ignore_warnings(category=UserWarning)
-def classifier_logistic_grid(X_train, y_train, verbose=False, random_state=0, grid_params=None):
+def classifier_logistic_grid(X_train, y_train, verbose=False, random_state=0, grid_params=None, dtype_policy=None, search="grid"):
     if verbose: print("logisticregression")
-    if grid_params is None:
+    if grid_params is None and search == "path":
+        grid_params = { 'logisticregression__C' : LOGISTIC_PATH_C,
+                        'logisticregression__solver' : ["lbfgs"],
+                        'logisticregression__fit_intercept' : [True, False]}
+    elif grid_params is None:
         grid_params = { 'logisticregression__solver' : ["newton-cg", "lbfgs", "liblinear", "sag", "saga"],
                         'logisticregression__penalty' : [None, 'l2', 'l1', 'elasticnet'],
                         'logisticregression__fit_intercept' : [True, False]}
     # penalty='l2', *, dual=False, tol=0.0001, C=1.0, fit_intercept=True, intercept_scaling=1, class_weight=None, random_state=None, solver='lbfgs', max_iter=100, multi_class='auto', verbose=0, warm_start=False, n_jobs=None, l1_ratio=None
-    grid_pipeline = make_pipeline( LogisticRegression(random_state=random_state))
-    grid = GridSearchCV(grid_pipeline,param_grid=grid_params, cv=4)
+    grid_pipeline = with_dtype_policy(make_pipeline( LogisticRegression(random_state=random_state)), dtype_policy, grid_params)
+    if search == "path":
+        # Chemin de régularisation : tous les C d'un fold en une passe, chaque résolution partant de la précédente
+        grid = LogisticPathSearchCV(grid_pipeline, param_grid=grid_params, cv=4)
+    else:
+        grid = GridSearchCV(grid_pipeline,param_grid=grid_params, cv=4)
     grid.fit(X_train, y_train)
     if verbose: print("             DONE")
     return grid
 
 
-@ignore_warnings(category=UserWarning)
-def classifier_svc(X_train, y_train, random_state=0, grid_params=None, verbose=0):
+# Paramètres de SVC propres aux noyaux, et ceux réellement utilisés par chaque noyau
+SVC_KERNEL_SPECIFIC_PARAMS = ('gamma', 'degree', 'coef0')
+SVC_KERNEL_PARAMS = {'rbf': ('gamma',),
+                     'poly': ('gamma', 'degree', 'coef0'),
+                     'sigmoid': ('gamma', 'coef0'),
+                     'linear': ()}
+
+
+def prune_kernel_params(grid_params, kernel_key='kernel'):
+    """Découpe la grille par noyau en retirant les paramètres ignorés par ce noyau (ex : degree pour rbf)."""
+    if isinstance(grid_params, dict):
+        grid_params = [grid_params]
+    prefix = kernel_key[:-len('kernel')]
+    pruned = []
+    for grid in grid_params:
+        if kernel_key not in grid:
+            pruned.append(grid)
+            continue
+        for kernel in grid[kernel_key]:
+            kernel_params = SVC_KERNEL_PARAMS.get(kernel)
+            sub_grid = {}
+            for key, values in grid.items():
+                if key == kernel_key:
+                    sub_grid[key] = [kernel]
+                    continue
+                param = key[len(prefix):] if key.startswith(prefix) else None
+                if kernel_params is not None and param in SVC_KERNEL_SPECIFIC_PARAMS and param not in kernel_params:
+                    continue
+                sub_grid[key] = values
+            pruned.append(sub_grid)
+    return pruned
+
+
+def prefix_grid_params(grid_params, prefix):
+    """Préfixe les noms des paramètres de la grille (dict ou liste de dicts), ex : 'C' -> 'svc__C'."""
+    if isinstance(grid_params, dict):
+        return {prefix+key: values for key, values in grid_params.items()}
+    return [prefix_grid_params(grid, prefix) for grid in grid_params]
+
+
+def _get_search(estimator, grid_params, search="grid", cv=None, n_jobs=None, verbose=0, factor=3, random_state=0):
+    if search == "grid":
+        return GridSearchCV(estimator, grid_params, cv=cv, n_jobs=n_jobs, verbose=verbose)
+    if search == "distributed":
+        # Tâches (candidat, fold) réparties sur n_jobs workers locaux et les workers distants connectés
+        return DistributedGridSearchCV(estimator, grid_params, cv=cv, verbose=verbose, n_local_workers=n_jobs or 1)
+    if search == "path":
+        # Régressions logistiques uniquement : C parcouru en warm start sur chaque fold
+        return LogisticPathSearchCV(estimator, grid_params, cv=cv, verbose=verbose)
+    if search == "halving":
+        # Successive halving : le nombre d'échantillons d'entraînement augmente à chaque tour
+        # et seul le meilleur 1/factor des candidats passe au tour suivant
+        return HalvingGridSearchCV(estimator, grid_params, cv=cv, n_jobs=n_jobs, verbose=verbose, factor=factor,
+                                   resource='n_samples', min_resources='exhaust', random_state=random_state)
+    raise ValueError(f"Unknown search mode : {search}")
+
+
+def get_scale_gamma(X, n_samples=10000, random_state=0):
+    """Équivalent de gamma='scale' de SVC (1 / (n_features * X.var())), estimé sur un sous-échantillon."""
+    X = X.to_numpy() if hasattr(X, "to_numpy") else X
+    if X.shape[0] > n_samples:
+        X = X[np.sort(np.random.RandomState(random_state).choice(X.shape[0], n_samples, replace=False))]
+    X = X.toarray() if sparse.issparse(X) else X
+    var = np.asarray(X, dtype=np.float64).var()
+    return 1.0 / (X.shape[1] * var) if var > 0 else 1.0
+
+
+def get_kernel_approximation(approximation, random_state=0):
+    """Approximation explicite du noyau : 'nystroem' (points de repère) ou 'rff' (random Fourier features, noyau rbf)."""
+    if approximation == "nystroem":
+        return Nystroem(kernel='rbf', random_state=random_state)
+    if approximation == "rff":
+        return RBFSampler(random_state=random_state)
+    raise ValueError(f"Unknown kernel approximation : {approximation}")
+
+
+def get_approximate_svc_grid(X_train, step_prefix=""):
+    """Grille par défaut du mode noyau approché : gamma autour de l'équivalent de 'scale' et nombre de composantes."""
+    gamma = get_scale_gamma(X_train)
+    return {'kernel__n_components': [300, 1000, 3000],
+            'kernel__gamma': [gamma / 10, gamma, gamma * 10],
+            step_prefix+'C': [0.01, 0.1, 1.0, 10, 100]}
+
+
+@ignore_warnings(category=(UserWarning, ConvergenceWarning))
+def classifier_svc(X_train, y_train, random_state=0, grid_params=None, verbose=0, search="grid", factor=3, approximation=None, dtype_policy=None):
+    """approximation : None pour le SVC exact, 'nystroem' ou 'rff' pour un noyau approché suivi d'un LinearSVC
+    (fit linéaire en nombre d'échantillons, prédiction par produits matriciels)."""
     if verbose: print("SVC")
-    #dict_keys(['C', 'break_ties', 'cache_size', 'class_weight', 'coef0', 'decision_function_shape', 'degree', 'gamma', 'kernel', 'max_iter', 'probability', 'random_state', 'shrinking', 'tol', 'verbose'])
-    if grid_params is None:
-        grid_params = [
-                {'kernel': ['rbf'], 'gamma': ['auto', 'scale', 0.1, 1, 10], 'C': [0.01, 0.1, 1.0, 10, 100]},
-                {'kernel': ['poly'], 'degree': [3, 10, 30], 'C': [0.01, 0.1, 1.0, 10, 100]},
-                {'kernel': ['linear'], 'C': [0.01, 0.1, 1.0, 10, 100]}
-            ]
-
-    clf = GridSearchCV(svm.SVC(random_state=random_state), grid_params, cv=4, n_jobs=4, verbose=verbose)
+    if approximation is not None:
+        if grid_params is None:
+            # gamma estimé sur les données telles que le modèle les reçoit (après la politique de type)
+            grid_params = get_approximate_svc_grid(as_model_input(X_train, dtype_policy), step_prefix='svm__')
+        estimator = Pipeline(steps=[('kernel', get_kernel_approximation(approximation, random_state=random_state)),
+                                    ('svm', LinearSVC(random_state=random_state))])
+    else:
+        #dict_keys(['C', 'break_ties', 'cache_size', 'class_weight', 'coef0', 'decision_function_shape', 'degree', 'gamma', 'kernel', 'max_iter', 'probability', 'random_state', 'shrinking', 'tol', 'verbose'])
+        if grid_params is None:
+            grid_params = [
+                    {'kernel': ['rbf'], 'gamma': ['auto', 'scale', 0.1, 1, 10], 'C': [0.01, 0.1, 1.0, 10, 100]},
+                    {'kernel': ['poly'], 'degree': [3, 10, 30], 'C': [0.01, 0.1, 1.0, 10, 100]},
+                    {'kernel': ['linear'], 'C': [0.01, 0.1, 1.0, 10, 100]}
+                ]
+        grid_params = prune_kernel_params(grid_params, kernel_key='kernel')
+        estimator = svm.SVC(random_state=random_state)
+        if with_dtype_policy(estimator, dtype_policy) is not estimator:
+            # Le SVC devient l'étape 'svc' d'un pipeline précédé de la conversion des pixels
+            estimator = Pipeline(steps=[('svc', estimator)])
+            grid_params = prefix_grid_params(grid_params, 'svc__')
+    estimator = with_dtype_policy(estimator, dtype_policy, grid_params)
+
+    clf = _get_search(estimator, grid_params, search=search, cv=4, n_jobs=4, verbose=verbose, factor=factor, random_state=random_state)
     clf.fit(X_train, y_train)
     print(clf.best_params_)
     if verbose: print("             DONE")
     return clf
 
 
-@ignore_warnings(category=UserWarning)
-def classifier_svc_pca(X_train, y_train, random_state=0, grid_params=None, verbose=0):
+@ignore_warnings(category=(UserWarning, ConvergenceWarning))
+def classifier_svc_pca(X_train, y_train, random_state=0, grid_params=None, verbose=0, search="grid", factor=3, pca_cache=True, approximation=None, dtype_policy=None):
     if verbose: print("SVC et PCA")
 
-    pipe = Pipeline(steps=[('pca', PCA()), ('svm', svm.SVC(random_state=random_state))])
-
     # Syntaxe : nomdustep__nomduparamètre
-    if grid_params is None:
+    if grid_params is None and approximation is not None:
+        grid_params = dict(get_approximate_svc_grid(as_model_input(X_train, dtype_policy), step_prefix='svm__'), pca__n_components=[15, 30, 45, 64])
+    elif grid_params is None:
         grid_params = {
             'pca__n_components': [2, 3, 4, 5, 15, 30, 45, 64],
             'svm__C': [0.01, 0.1, 1.0, 10, 100],
@@ -90,7 +1010,24 @@ def classifier_svc_pca(X_train, y_train, random_state=0, grid_params=None, verbo
             'svm__gamma': ['auto', 'scale', 0.1, 1, 10],
             'svm__degree': [3, 10, 30]
         }
-    search = GridSearchCV(pipe, grid_params, n_jobs=4, verbose=1)
+    grid_params = prune_kernel_params(grid_params, kernel_key='svm__kernel')
+
+    # La PCA est entraînée une fois par fold avec le plus grand nombre de composantes de la grille
+    if pca_cache:
+        n_components_list = [n for grid in grid_params for n in grid.get('pca__n_components', [])]
+        pca = PrefixPCA(max_components=max(n_components_list) if n_components_list else None, random_state=random_state)
+    else:
+        pca = PCA()
+    if approximation is not None:
+        # Noyau approché : pca -> projection explicite du noyau -> solveur linéaire
+        pipe = Pipeline(steps=[('pca', pca), ('kernel', get_kernel_approximation(approximation, random_state=random_state)),
+                               ('svm', LinearSVC(random_state=random_state))])
+    else:
+        pipe = Pipeline(steps=[('pca', pca), ('svm', svm.SVC(random_state=random_state))])
+
+    pipe = with_dtype_policy(pipe, dtype_policy, grid_params)
+
+    search = _get_search(pipe, grid_params, search=search, n_jobs=4, verbose=1, factor=factor, random_state=random_state)
     search.fit(X_train, y_train)
     if verbose: print("             DONE")
     return search
@@ -105,93 +1042,748 @@ def display_scores(models_list, X_test, y_test, X_test_pca=None, y_column_name=N
         if "pca" in model_name and X_test_pca is not None:
             X_temp = X_test_pca
         
-        print(model_name, " "*(18-len(model_name)), ":", round(model_grid.score(X_temp, y_temp), 3), end="")
-        if isinstance(model_grid, GridSearchCV):
+        if is_classifier(model_grid):
+            score = np.mean(batch_predict(model_grid, X_temp) == np.asarray(y_temp))
+        else:
+            score = model_grid.score(X_temp, y_temp)
+        print(model_name, " "*(18-len(model_name)), ":", round(score, 3), end="")
+        if hasattr(model_grid, "best_params_"):
             print(model_grid.best_params_)
         else:
             print("")
 
 from sklearn.metrics import *
+from sklearn.metrics import check_scoring
 from sklearn.metrics import roc_curve, RocCurveDisplay, precision_recall_curve, PrecisionRecallDisplay
 
 from collections import defaultdict
 import pandas as pd
+from scipy.stats import rankdata
+from sklearn.model_selection._search import BaseSearchCV
+from sklearn.multiclass import OneVsRestClassifier, OneVsOneClassifier
 from mlinsights.mlmodel import PredictableTSNE
 
+# ----------------------------------------------------------------------------------
+#                        MODELS : KNN approché (index IVF)
+# ----------------------------------------------------------------------------------
+IVF_INDEX_FILES = ("centroids", "offsets", "points", "sq_norms", "labels", "indices", "classes")
+
+
+class IVFKNeighborsClassifier(BaseEstimator, ClassifierMixin):
+    """KNN approché par index IVF (inverted file) : les points d'entraînement sont répartis en n_lists
+    listes par un k-means grossier, et chaque requête n'est comparée qu'aux points des n_probe listes
+    dont le centroïde est le plus proche.
+
+    n_probe règle le compromis rappel / vitesse (n_probe = n_lists donne la recherche exacte).
+    """
+
+    def __init__(self, n_neighbors=3, n_lists=64, n_probe=4, weights="uniform", train_sample=20000, batch_size=None, random_state=0):
+        self.n_neighbors = n_neighbors
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.weights = weights
+        self.train_sample = train_sample
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X = np.asarray(X.to_numpy() if hasattr(X, "to_numpy") else X, dtype=np.float32)
+        batch_size = self.batch_size or PREDICT_BATCH_SIZE
+        self.classes_, y_enc = np.unique(np.asarray(y), return_inverse=True)
+        n_lists = min(self.n_lists, X.shape[0])
+
+        # Quantificateur grossier appris sur un sous-échantillon
+        rng = np.random.RandomState(self.random_state)
+        sample = X if self.train_sample is None or X.shape[0] <= self.train_sample else X[rng.choice(X.shape[0], self.train_sample, replace=False)]
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, batch_size=4096, n_init=1, random_state=self.random_state).fit(sample)
+        self.centroids_ = kmeans.cluster_centers_.astype(np.float32)
+
+        # Points triés par liste : la liste l occupe points_[offsets_[l]:offsets_[l+1]]
+        assign = np.concatenate([self._nearest_lists(X[start:start + batch_size], 1)[:, 0]
+                                 for start in range(0, X.shape[0], batch_size)])
+        order = np.argsort(assign, kind="stable")
+        self.offsets_ = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+        self.points_ = X[order]
+        self.sq_norms_ = np.einsum("ij,ij->i", self.points_, self.points_)
+        self.labels_ = y_enc[order]
+        self.indices_ = order
+        return self
+
+    def _nearest_lists(self, X, n_probe):
+        d = euclidean_distances(X, self.centroids_, squared=True)
+        n_probe = min(n_probe, d.shape[1])
+        if n_probe == d.shape[1]:
+            return np.argsort(d, axis=1)
+        return np.argpartition(d, n_probe - 1, axis=1)[:, :n_probe]
+
+    def kneighbors(self, X, n_neighbors=None):
+        """Retourne (distances, indices) approchés, indices dans X_train comme KNeighborsClassifier (-1 si non trouvé)."""
+        distances, positions = self._kneighbors(X, n_neighbors)
+        return distances, np.where(positions >= 0, self.indices_[positions], -1)
+
+    def _kneighbors(self, X, n_neighbors=None):
+        # Positions des voisins dans l'ordre trié de l'index (points_, labels_)
+        k = self.n_neighbors if n_neighbors is None else n_neighbors
+        X = np.asarray(X.to_numpy() if hasattr(X, "to_numpy") else X, dtype=np.float32)
+        best_d = np.full((X.shape[0], k), np.inf, dtype=np.float32)
+        best_i = np.full((X.shape[0], k), -1, dtype=np.int64)
+        batch_size = self.batch_size or PREDICT_BATCH_SIZE
+        for start in range(0, X.shape[0], batch_size):
+            stop = min(start + batch_size, X.shape[0])
+            self._search_batch(X[start:stop], best_d[start:stop], best_i[start:stop])
+        # Tri final des k voisins par distance croissante
+        order = np.argsort(best_d, axis=1)
+        best_d = np.take_along_axis(best_d, order, axis=1)
+        best_i = np.take_along_axis(best_i, order, axis=1)
+        return np.sqrt(np.maximum(best_d, 0)), best_i
+
+    def _search_batch(self, X, best_d, best_i):
+        k = best_d.shape[1]
+        probes = self._nearest_lists(X, self.n_probe)
+        q_norms = np.einsum("ij,ij->i", X, X)
+        # Parcours par liste : toutes les requêtes qui sondent la liste l sont traitées par un seul produit matriciel
+        queries = np.repeat(np.arange(X.shape[0]), probes.shape[1])
+        lists = probes.ravel()
+        order = np.argsort(lists, kind="stable")
+        queries, lists = queries[order], lists[order]
+        bounds = np.flatnonzero(np.diff(lists)) + 1
+        for q_idx, l in zip(np.split(queries, bounds), lists[np.concatenate([[0], bounds]).astype(int)]):
+            start, stop = self.offsets_[l], self.offsets_[l + 1]
+            if start == stop:
+                continue
+            d = q_norms[q_idx, None] - 2 * X[q_idx] @ self.points_[start:stop].T + self.sq_norms_[None, start:stop]
+            cand_d = np.concatenate([best_d[q_idx], d], axis=1)
+            cand_i = np.concatenate([best_i[q_idx], np.broadcast_to(np.arange(start, stop), d.shape)], axis=1)
+            if cand_d.shape[1] > k:
+                keep = np.argpartition(cand_d, k - 1, axis=1)[:, :k]
+                cand_d = np.take_along_axis(cand_d, keep, axis=1)
+                cand_i = np.take_along_axis(cand_i, keep, axis=1)
+            best_d[q_idx] = cand_d[:, :k]
+            best_i[q_idx] = cand_i[:, :k]
+
+    def predict_proba(self, X):
+        distances, neighbors = self._kneighbors(X)
+        if self.weights == "uniform":
+            w = np.ones(distances.shape)
+        elif self.weights == "distance":
+            with np.errstate(divide="ignore"):
+                w = 1.0 / distances
+            zero_rows = np.isinf(w).any(axis=1)
+            w[zero_rows] = np.isinf(w[zero_rows])
+        else:
+            raise ValueError(f"Unsupported weights for IVFKNeighborsClassifier : {self.weights}")
+        # Voisins manquants (listes sondées trop petites) : poids nul
+        w[neighbors < 0] = 0
+        proba = np.zeros((distances.shape[0], len(self.classes_)))
+        rows = np.repeat(np.arange(distances.shape[0]), distances.shape[1])
+        np.add.at(proba, (rows, self.labels_[neighbors].ravel()), w.ravel())
+        total = proba.sum(axis=1, keepdims=True)
+        total[total == 0] = 1
+        return proba / total
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, path):
+        """Enregistre l'index dans le répertoire path (un fichier .npy par tableau)."""
+        os.makedirs(path, exist_ok=True)
+        for name in IVF_INDEX_FILES:
+            np.save(os.path.join(path, name + ".npy"), getattr(self, name + "_"))
+        with open(os.path.join(path, "params.pkl"), "wb") as f:
+            pickle.dump(self.get_params(), f)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Recharge un index enregistré par save ; les points restent sur disque avec mmap_mode='r'."""
+        with open(os.path.join(path, "params.pkl"), "rb") as f:
+            model = cls(**pickle.load(f))
+        for name in IVF_INDEX_FILES:
+            setattr(model, name + "_", np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode, allow_pickle=name == "classes"))
+        return model
+
+
+# ----------------------------------------------------------------------------------
+#                        MODELS : PROFILING
+# ----------------------------------------------------------------------------------
+# Hooks appelés avec un enregistrement (dict) à la fin de chaque phase profilée
+PROFILING_HOOKS = []
+
+
+def add_profiling_hook(hook):
+    if hook not in PROFILING_HOOKS:
+        PROFILING_HOOKS.append(hook)
+    return hook
+
+
+def remove_profiling_hook(hook):
+    if hook in PROFILING_HOOKS:
+        PROFILING_HOOKS.remove(hook)
+
+
+def get_peak_rss_mb():
+    """Pic de mémoire résidente (MB) atteint par le processus courant."""
+    if resource is None:
+        return np.nan
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS et en kilo-octets sous Linux
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def get_process_private_mb(pid):
+    """Mémoire propre (MB) du processus pid : Private_Clean + Private_Dirty de /proc/<pid>/smaps_rollup.
+
+    Contrairement à la mémoire résidente, les pages qu'un processus fils (fork) partage encore avec son
+    parent ne sont pas comptées. Repli sur statm (résidente - partagée) si smaps_rollup est indisponible.
+    """
+    try:
+        private_kb = 0
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                    private_kb += int(line.split()[1])
+        return private_kb / 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            _, resident_pages, shared_pages = (int(v) for v in f.read().split()[:3])
+    except (OSError, ValueError):
+        return np.nan
+    return (resident_pages - shared_pages) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+
+
+@contextmanager
+def profile_phase(model_name, phase, hooks=None, **extra):
+    """Mesure une phase (temps réel, temps CPU du processus, pic mémoire) et transmet l'enregistrement aux hooks.
+
+    Le pic mémoire de la phase ("peak traced MB") n'est disponible que si tracemalloc est actif ;
+    "peak rss MB" est le maximum de mémoire résidente atteint par le processus depuis son démarrage.
+    """
+    active_hooks = PROFILING_HOOKS + list(hooks or [])
+    if not active_hooks:
+        yield None
+        return
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    record = {"model": model_name, "phase": phase}
+    record.update(extra)
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record["wall seconde"] = time.perf_counter() - wall0
+        record["cpu seconde"] = time.process_time() - cpu0
+        record["peak rss MB"] = get_peak_rss_mb()
+        record["peak traced MB"] = tracemalloc.get_traced_memory()[1] / 1024**2 if tracing else np.nan
+        for hook in active_hooks:
+            hook(record)
+
+
+class DataFrameProfiler:
+    """Hook qui conserve les enregistrements de profiling pour les restituer en DataFrame.
+
+    with DataFrameProfiler(trace_memory=True) as profiler:
+        fit_and_test_models(...)
+    profiler.to_dataframe()
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._started_tracing = False
+
+    def __call__(self, record):
+        self.records.append(dict(record))
+
+    def __enter__(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        add_profiling_hook(self)
+        return self
+
+    def __exit__(self, *exc):
+        remove_profiling_hook(self)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.records)
+
+
+def logging_profiling_hook(logger=None, level=logging.INFO):
+    """Retourne un hook qui écrit chaque enregistrement de profiling dans un logger."""
+    if logger is None:
+        logger = logging.getLogger("mnist_function.profiling")
+
+    def hook(record):
+        logger.log(level, "%s | %s | wall %.3f s | cpu %.3f s | peak rss %.1f MB | peak traced %.1f MB",
+                   record["model"], record["phase"], record["wall seconde"], record["cpu seconde"],
+                   record["peak rss MB"], record["peak traced MB"])
+    return hook
+
+
+# ----------------------------------------------------------------------------------
+#                        MODELS : ENTRAINEMENT INCREMENTAL (partial_fit)
+# ----------------------------------------------------------------------------------
+PARTIAL_FIT_BATCH_SIZE = 2048
+
+
+def iter_minibatches(X, y, batch_size=PARTIAL_FIT_BATCH_SIZE, shuffle=True, random_state=0, dtype=np.float64, dtype_policy=None):
+    """Parcourt (X, y) par minibatchs ; X peut être un tableau mappé en mémoire ou le chemin d'un fichier .npy.
+
+    Seul le minibatch courant est chargé en mémoire. Avec shuffle, l'ordre des blocs et l'ordre
+    des lignes dans chaque bloc sont mélangés (les lectures sur disque restent contiguës).
+    Si X est une matrice sparse (CSR), les minibatchs restent sparse.
+    dtype_policy (voir DTYPE_POLICIES) est appliquée à chaque minibatch (au lieu de dtype) : les pixels
+    restent stockés en uint8 et seul le minibatch courant est converti.
+    """
+    if isinstance(X, str):
+        X = np.load(X, mmap_mode="r")
+    if isinstance(y, str):
+        y = np.load(y, mmap_mode="r")
+    if hasattr(X, "to_numpy"):
+        X = X.to_numpy()
+    y = np.asarray(y)
+    n = X.shape[0]
+    starts = np.arange(0, n, batch_size)
+    rng = np.random.RandomState(random_state)
+    if shuffle:
+        rng.shuffle(starts)
+    for start in starts:
+        stop = min(start + batch_size, n)
+        X_batch = X[start:stop]
+        if dtype_policy is not None and DTYPE_POLICIES[dtype_policy][0] is not None:
+            X_batch = as_model_input(X_batch, dtype_policy, cache=False)
+        else:
+            X_batch = X_batch.astype(dtype, copy=False) if sparse.issparse(X_batch) else np.asarray(X_batch, dtype=dtype)
+        y_batch = y[start:stop]
+        if shuffle:
+            order = rng.permutation(stop - start)
+            X_batch, y_batch = X_batch[order], y_batch[order]
+        yield X_batch, y_batch
+
+
+def prefetch(iterator, n_prefetch=2):
+    """Produit les éléments de iterator calculés à l'avance par un thread (au plus n_prefetch en attente)."""
+    items = queue.Queue(maxsize=n_prefetch)
+    end = object()
+    stop = threading.Event()
+
+    def producer():
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    return
+                items.put(item)
+            items.put(end)
+        except BaseException as ex:
+            items.put(ex)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is end:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Libère le producteur s'il est bloqué sur une file pleine
+        while thread.is_alive():
+            try:
+                items.get_nowait()
+            except queue.Empty:
+                thread.join(0.01)
+
+
+def fit_incremental(model, X, y, classes=None, epochs=1, batch_size=PARTIAL_FIT_BATCH_SIZE, shuffle=True, use_prefetch=True, random_state=0, verbose=0, model_name="", profile_hooks=None, dtype_policy=None):
+    """Entraîne un estimateur qui supporte partial_fit (SGDClassifier, naive Bayes, KMeansPrototypeClassifier...)
+    par minibatchs lus depuis X (éventuellement sur disque), pendant epochs passes.
+    dtype_policy : politique de type appliquée à chaque minibatch (voir iter_minibatches).
+    """
+    if not hasattr(model, "partial_fit"):
+        raise ValueError(f"{type(model).__name__} does not support partial_fit")
+    if classes is None:
+        classes = np.unique(np.load(y, mmap_mode="r") if isinstance(y, str) else np.asarray(y))
+    for epoch in range(epochs):
+        with profile_phase(model_name, "partial_fit epoch", profile_hooks, epoch=epoch):
+            batches = iter_minibatches(X, y, batch_size=batch_size, shuffle=shuffle, random_state=random_state + epoch, dtype_policy=dtype_policy)
+            if use_prefetch:
+                batches = prefetch(batches)
+            for X_batch, y_batch in batches:
+                model.partial_fit(X_batch, y_batch, classes=classes)
+        if verbose:
+            print(model_name, "epoch", epoch + 1, "/", epochs, "DONE")
+    return model
+
+
+def get_incremental_params(model, incremental):
+    """Paramètres de fit_incremental utilisés pour model avec incremental (True ou dict) ; None si model est entraîné par fit."""
+    if incremental and hasattr(model, "partial_fit"):
+        return incremental if isinstance(incremental, dict) else {}
+    return None
+
+
+class KMeansPrototypeClassifier(BaseEstimator, ClassifierMixin):
+    """Classifieur par prototypes : un MiniBatchKMeans par classe, prédiction par le prototype le plus proche.
+
+    Supporte partial_fit pour l'entraînement incrémental.
+    """
+
+    def __init__(self, n_prototypes=10, batch_size=1024, random_state=0):
+        self.n_prototypes = n_prototypes
+        self.batch_size = batch_size
+        self.random_state = random_state
+
+    def partial_fit(self, X, y, classes=None):
+        if not hasattr(self, "kmeans_"):
+            if classes is None:
+                raise ValueError("classes must be passed on the first call to partial_fit")
+            self.classes_ = np.asarray(classes)
+            self.kmeans_ = [MiniBatchKMeans(n_clusters=self.n_prototypes, batch_size=self.batch_size, random_state=self.random_state, n_init=1)
+                            for _ in self.classes_]
+            # Échantillons mis de côté tant qu'une classe n'en a pas assez pour initialiser ses prototypes
+            self._pending = [[] for _ in self.classes_]
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y)
+        for i, c in enumerate(self.classes_):
+            X_c = X[y == c]
+            if len(X_c) == 0:
+                continue
+            if not hasattr(self.kmeans_[i], "cluster_centers_"):
+                self._pending[i].append(X_c)
+                X_c = np.concatenate(self._pending[i])
+                if len(X_c) < self.n_prototypes:
+                    continue
+                self._pending[i] = []
+            self.kmeans_[i].partial_fit(X_c)
+        return self
+
+    def fit(self, X, y):
+        for attr in ("kmeans_", "classes_", "_pending"):
+            if hasattr(self, attr):
+                delattr(self, attr)
+        classes = np.unique(y)
+        for X_batch, y_batch in iter_minibatches(X, y, batch_size=self.batch_size * len(classes), random_state=self.random_state):
+            self.partial_fit(X_batch, y_batch, classes=classes)
+        return self
+
+    def decision_function(self, X):
+        # Opposé de la distance au prototype le plus proche de chaque classe
+        X = np.asarray(X, dtype=np.float64)
+        scores = np.full((X.shape[0], len(self.classes_)), -np.inf)
+        for i, kmeans in enumerate(self.kmeans_):
+            if hasattr(kmeans, "cluster_centers_"):
+                scores[:, i] = -np.sqrt(euclidean_distances(X, kmeans.cluster_centers_, squared=True).min(axis=1))
+        return scores
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.decision_function(X), axis=1)]
+
+
 # ----------------------------------------------------------------------------------
 #                        MODELS : METRICS
 # ----------------------------------------------------------------------------------
-def get_metrics_for_the_model(model, X_test, y_test, y_pred,scores=None, model_name="", r2=None, full_metrics=False, verbose=0, transformer=None):
+# Inférence par blocs : limite la taille des matrices intermédiaires (distances KNN, noyaux SVC)
+PREDICT_BATCH_SIZE = 2048
+PREDICT_N_JOBS = None
+
+
+def batch_predict(model, X, method="predict", batch_size=None, n_jobs=None):
+    """Appelle model.<method> par blocs de batch_size lignes, éventuellement en parallèle (threads).
+
+    Les résultats de chaque bloc sont écrits directement dans le tableau de sortie pré-alloué.
+    """
+    func = getattr(model, method)
+    if batch_size is None:
+        batch_size = PREDICT_BATCH_SIZE
+    if n_jobs is None:
+        n_jobs = PREDICT_N_JOBS
+    n = X.shape[0]
+    if not batch_size or n <= batch_size:
+        return func(X)
+
+    def take(start, stop):
+        return X.iloc[start:stop] if hasattr(X, "iloc") else X[start:stop]
+
+    bounds = [(start, min(start + batch_size, n)) for start in range(0, n, batch_size)]
+    first = func(take(*bounds[0]))
+    out = np.empty((n,) + first.shape[1:], dtype=first.dtype)
+    out[:bounds[0][1]] = first
+
+    def run(bound):
+        start, stop = bound
+        out[start:stop] = func(take(start, stop))
+
+    if n_jobs is not None and n_jobs != 1:
+        max_workers = os.cpu_count() if n_jobs < 0 else n_jobs
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(run, bounds[1:]))
+    else:
+        for bound in bounds[1:]:
+            run(bound)
+    return out
+
+
+# Classifieurs pour lesquels predict(X) == classes_[argmax(predict_proba(X) ou decision_function(X))] :
+# une seule inférence suffit pour obtenir à la fois les labels et les scores
+SCORE_CONSISTENT_CLASSIFIERS = (LogisticRegression, LinearSVC, KNeighborsClassifier, OneVsRestClassifier,
+                                SGDClassifier, GaussianNB, MultinomialNB, BernoulliNB, KMeansPrototypeClassifier,
+                                IVFKNeighborsClassifier)
+
+
+def _final_estimator(model):
+    if isinstance(model, BaseSearchCV) and hasattr(model, "best_estimator_"):
+        return _final_estimator(model.best_estimator_)
+    if isinstance(model, Pipeline):
+        return _final_estimator(model.steps[-1][1])
+    return model
+
+
+def predict_labels_and_scores(model, X_test, with_scores=False, transformer=None, batch_size=None, n_jobs=None, model_name="", hooks=None):
+    """Inférence unique sur X_test : retourne (y_pred, y_score, score_kind, predict_seconde).
+
+    y_score contient predict_proba (score_kind="proba") ou à défaut decision_function
+    (score_kind="decision") lorsque with_scores est vrai, sinon None.
+    """
+    t0 = time.perf_counter()
+    y_score = None
+    score_kind = None
+    if transformer is not None and isinstance(transformer, PredictableTSNE):
+        y_pred = transformer.transforme(X_test)
+    elif transformer is not None and isinstance(model, PredictableTSNE):
+        y_pred = model.transforme(X_test)
+    else:
+        consistent = isinstance(_final_estimator(model), SCORE_CONSISTENT_CLASSIFIERS)
+        y_pred = None
+        if with_scores or consistent:
+            for method, kind in (("predict_proba", "proba"), ("decision_function", "decision")):
+                if not hasattr(model, method):
+                    continue
+                try:
+                    with profile_phase(model_name, method, hooks):
+                        y_score = batch_predict(model, X_test, method=method, batch_size=batch_size, n_jobs=n_jobs)
+                except Exception:
+                    continue
+                score_kind = kind
+                break
+            # Les labels sont déduits des scores sans seconde inférence
+            if y_score is not None and consistent:
+                classes = model.classes_
+                if y_score.ndim == 1:
+                    y_pred = classes[(y_score > 0).astype(int)]
+                elif y_score.shape[1] == len(classes):
+                    y_pred = classes[np.argmax(y_score, axis=1)]
+        if y_pred is None:
+            with profile_phase(model_name, "predict", hooks):
+                y_pred = batch_predict(model, X_test, batch_size=batch_size, n_jobs=n_jobs)
+        if not with_scores:
+            y_score = None
+            score_kind = None
+    return y_pred, y_score, score_kind, time.perf_counter() - t0
+
+
+def _binary_auc(ranks, positives):
+    # AUC de Mann-Whitney calculée colonne par colonne à partir des rangs
+    n_pos = positives.sum(axis=0)
+    n_neg = positives.shape[0] - n_pos
+    sum_pos = (ranks * positives).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (sum_pos - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+def one_hot_to_labels(Y):
+    """Labels entiers à partir d'un DataFrame one-hot (colonnes 'class_0' ... 'class_9') ou d'une matrice (n, n_classes)."""
+    Y = Y.to_numpy() if hasattr(Y, "to_numpy") else np.asarray(Y)
+    return np.argmax(Y, axis=1)
+
+
+def _subsample_thresholds(indexes, max_thresholds):
+    if max_thresholds is None or len(indexes) <= max_thresholds:
+        return indexes
+    return indexes[np.unique(np.linspace(0, len(indexes) - 1, max_thresholds).round().astype(np.int64))]
+
+
+def multiclass_curves(y_true, y_score, classes=None, max_thresholds=None):
+    """Courbes ROC et précision-rappel (un contre tous) de toutes les classes.
+
+    y_true : labels (ou DataFrame one-hot), y_score : matrice (n, n_classes).
+    Un seul argsort par colonne (sur toute la matrice) puis des cumsum vectorisés ; les AUC (roc_auc,
+    average_precision, identiques à sklearn) sont calculées sur tous les seuils, les courbes peuvent
+    être réduites à max_thresholds points pour l'affichage.
+    Retourne {classe: {"fpr", "tpr", "roc_auc", "precision", "recall", "average_precision", "thresholds"}}.
+    """
+    y_score = np.asarray(y_score)
+    if np.ndim(y_true) == 2:
+        y_true = one_hot_to_labels(y_true)
+    y_true = y_true.to_numpy() if hasattr(y_true, "to_numpy") else np.asarray(y_true)
+    if classes is None:
+        classes = np.arange(y_score.shape[1])
+    classes = np.asarray(classes)
+
+    order = np.argsort(-y_score, axis=0, kind="mergesort")
+    sorted_scores = np.take_along_axis(y_score, order, axis=0)
+    positives = y_true[order] == classes[None, :]
+    tps = np.cumsum(positives, axis=0)
+    fps = np.arange(1, len(y_true) + 1)[:, None] - tps
+    n_pos, n_neg = tps[-1], fps[-1]
+    # Un seuil par valeur distincte de score : dernière position de chaque groupe d'ex-aequo
+    distinct = np.ones_like(positives)
+    distinct[:-1] = sorted_scores[:-1] != sorted_scores[1:]
+
+    curves = {}
+    for i, label in enumerate(classes):
+        idx = np.flatnonzero(distinct[:, i])
+        tp, fp = tps[idx, i].astype(np.float64), fps[idx, i].astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            tpr = np.concatenate([[0], tp / n_pos[i]])
+            fpr = np.concatenate([[0], fp / n_neg[i]])
+            precision = tp / (tp + fp)
+            recall = tp / n_pos[i]
+        roc_auc = np.trapezoid(tpr, fpr) if hasattr(np, "trapezoid") else np.trapz(tpr, fpr)
+        average_precision = np.sum(np.diff(np.concatenate([[0], recall])) * precision)
+
+        keep = _subsample_thresholds(np.arange(len(idx)), max_thresholds)
+        curves[label] = {"fpr": np.concatenate([[0], fpr[1:][keep]]),
+                         "tpr": np.concatenate([[0], tpr[1:][keep]]),
+                         "roc_auc": float(roc_auc),
+                         # Même convention que precision_recall_curve : rappel décroissant, terminé par (1, 0)
+                         "precision": np.concatenate([precision[keep][::-1], [1]]),
+                         "recall": np.concatenate([recall[keep][::-1], [0]]),
+                         "average_precision": float(average_precision),
+                         "thresholds": sorted_scores[idx[keep], i]}
+    return curves
+
+
+def _regression_errors(labels, cm, n):
+    # Erreurs de régression calculées sur la valeur des labels, pondérées par la matrice de confusion
+    try:
+        values = labels.astype(float)
+    except (ValueError, TypeError):
+        return {key: np.nan for key in ("MAE", "MSE", "RMSE", "Mediane AE")}
+    errors = np.abs(values[:, None] - values[None, :])
+    mse = (cm * errors**2).sum() / n
+    order = np.argsort(errors, axis=None)
+    sorted_errors = errors.ravel()[order]
+    cumul = np.cumsum(cm.ravel()[order])
+    median_pos = np.searchsorted(cumul, [(n - 1) // 2, n // 2], side="right")
+    return {"MAE": (cm * errors).sum() / n,
+            "MSE": mse,
+            "RMSE": np.sqrt(mse),
+            "Mediane AE": sorted_errors[median_pos].mean()}
+
+
+def get_classification_metrics(y_test, y_pred, y_score=None, classes=None, score_kind=None, full_metrics=False, model_name="", hooks=None):
+    """Calcule toutes les métriques à partir d'une seule matrice de confusion et d'un seul tableau de scores."""
+    y_true = np.asarray(y_test)
+    y_pred = np.asarray(y_pred)
+    with profile_phase(model_name, "metric confusion matrix", hooks):
+        labels = np.union1d(y_true, y_pred)
+        n_labels = len(labels)
+        n = len(y_true)
+        true_idx = np.searchsorted(labels, y_true)
+        pred_idx = np.searchsorted(labels, y_pred)
+        cm = np.bincount(true_idx * n_labels + pred_idx, minlength=n_labels * n_labels).reshape(n_labels, n_labels)
+
+    metrics_dic = {}
+    tp = np.diag(cm).astype(float)
+    metrics_dic["Accuracy"] = tp.sum() / n
+
+    with profile_phase(model_name, "metric MAE MSE Mediane AE", hooks):
+        metrics_dic.update(_regression_errors(labels, cm, n))
+
+    if not full_metrics:
+        return metrics_dic
+
+    # Log loss et Brier à partir des probabilités
+    with profile_phase(model_name, "metric Brier Log loss", hooks):
+        if y_score is not None and score_kind == "proba" and classes is not None:
+            proba = y_score / y_score.sum(axis=1, keepdims=True)
+            y_onehot = (y_true[:, None] == np.asarray(classes)[None, :]).astype(float)
+            if len(classes) == 2:
+                metrics_dic['Brier  loss'] = np.mean((proba[:, 1] - y_onehot[:, 1])**2)
+            else:
+                metrics_dic['Brier  loss'] = np.mean(((proba - y_onehot)**2).sum(axis=1))
+            eps = np.finfo(proba.dtype).eps
+            metrics_dic['Log loss'] = -np.mean(np.log(np.clip((proba * y_onehot).sum(axis=1), eps, 1)))
+        else:
+            metrics_dic['Brier  loss'] = np.nan
+            metrics_dic['Log loss'] = np.nan
+
+    with profile_phase(model_name, "metric F1 Recall", hooks):
+        support = cm.sum(axis=1).astype(float)
+        predicted = cm.sum(axis=0).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            recall = np.nan_to_num(tp / support)
+            f1 = np.nan_to_num(2 * tp / (support + predicted))
+        weights = support / support.sum()
+        # En multi-classes mono-label, micro F1 == micro recall == accuracy
+        metrics_dic["F1 micro"] = tp.sum() / n
+        metrics_dic["F1 macro"] = f1.mean()
+        metrics_dic["F1 weighted"] = (f1 * weights).sum()
+        metrics_dic["Recall micro"] = tp.sum() / n
+        metrics_dic["Recall macro"] = recall.mean()
+        metrics_dic["Recall weighted"] = (recall * weights).sum()
+
+    # Roc auc ovo et ovr à partir des rangs des scores
+    metrics_dic["Roc auc ovo"] = np.nan
+    metrics_dic["Roc auc ovr"] = np.nan
+    if y_score is not None and classes is not None:
+        classes = np.asarray(classes)
+        if len(classes) == 2:
+            with profile_phase(model_name, "metric Roc auc", hooks):
+                score = y_score if y_score.ndim == 1 else y_score[:, 1]
+                auc = _binary_auc(rankdata(score)[:, None], (y_true == classes[1])[:, None])[0]
+                metrics_dic["Roc auc ovo"] = auc
+                metrics_dic["Roc auc ovr"] = auc
+        elif y_score.ndim == 2 and y_score.shape[1] == len(classes):
+            y_onehot = y_true[:, None] == classes[None, :]
+            with profile_phase(model_name, "metric Roc auc ovr", hooks):
+                metrics_dic["Roc auc ovr"] = np.mean(_binary_auc(rankdata(y_score, axis=0), y_onehot))
+            with profile_phase(model_name, "metric Roc auc ovo", hooks):
+                pair_aucs = []
+                for a in range(len(classes)):
+                    for b in range(a + 1, len(classes)):
+                        mask = y_onehot[:, a] | y_onehot[:, b]
+                        pair_score = y_score[mask][:, [a, b]]
+                        pair_pos = y_onehot[mask][:, [a, b]]
+                        pair_aucs.append(np.mean(_binary_auc(rankdata(pair_score, axis=0), pair_pos)))
+                metrics_dic["Roc auc ovo"] = np.mean(pair_aucs)
+    return metrics_dic
+
+
+def get_metrics_for_the_model(model, X_test, y_test, y_pred,scores=None, model_name="", r2=None, full_metrics=False, verbose=0, transformer=None, y_score=None, score_kind=None, profile_hooks=None):
     if scores is None:
         scores = defaultdict(list)
     scores["Model"].append(model_name)
-        
-    if r2 is None:
-        r2 = round(model.score(X_test, y_test),3)
-        
+
     if y_pred is None:
-        t0 = time.time()
-        if transformer is not None and isinstance(transformer, PredictableTSNE):
-            y_pred = transformer.transforme(X_test)
-        elif transformer is not None and isinstance(model, PredictableTSNE):
-            y_pred = model.transforme(X_test)
-        else:
-            y_pred = model.predict(X_test)
-        t_model = (time.time() - t0)   
+        y_pred, y_score, score_kind, t_model = predict_labels_and_scores(model, X_test, with_scores=full_metrics, transformer=transformer, model_name=model_name, hooks=profile_hooks)
         # Sauvegarde des scores
         scores["predict time"].append(time.strftime("%H:%M:%S", time.gmtime(t_model)))
         scores["predict seconde"].append(t_model)
-        
-    scores["R2"].append(r2)
-    scores["MAE"].append(mean_absolute_error(y_test, y_pred))
-    mse = mean_squared_error(y_test, y_pred)
-    scores["MSE"].append(mse)
-    scores["RMSE"].append(np.sqrt(mse))
-    scores["Mediane AE"].append(median_absolute_error(y_test, y_pred))
+    elif full_metrics and y_score is None:
+        _, y_score, score_kind, _ = predict_labels_and_scores(model, X_test, with_scores=True, transformer=transformer, model_name=model_name, hooks=profile_hooks)
 
-    if full_metrics:
-        try:
-            y_prob = model.predict_proba(X_test)
-        
-            for metric in [brier_score_loss, log_loss]:
-                score_name = metric.__name__.replace("_", " ").replace("score", "").capitalize()
-                try:
-                    scores[score_name].append(metric(y_test, y_prob[:, 1]))
-                except Exception as ex:
-                    scores[score_name].append(np.nan)
-                    if verbose > 0:
-                        print("005", model_name, score_name, ex)
-        except Exception as ex:
-            if verbose > 0:
-                print("003", model_name, "Proba", ex)
-            scores['Brier  loss'].append(np.nan)
-            scores['Log loss'].append(np.nan)
-                
-        for metric in [f1_score, recall_score]:
-            score_fc_name = metric.__name__.replace("_", " ").replace("score", "").capitalize()
-            av_list = ['micro', 'macro', 'weighted']
-            if metric == 3:
-                av_list.append(None)
-            for average in av_list:
-                try:
-                    score_name = score_fc_name+str(average)
-                    scores[score_name].append(metric(y_test, y_pred, average=average))
-                except Exception as ex:
-                    if verbose > 0:
-                        print("005", model_name, score_name, ex)
-                    scores[score_name].append(np.nan)
-
-        # Roc auc  multi_class must be in ('ovo', 'ovr')   
-        for metric in [roc_auc_score]:
-            score_fc_name = metric.__name__.replace("_", " ").replace("score", "").capitalize()
-            for average in ['ovo', 'ovr']:
-                try:
-                    score_name = score_fc_name+str(average)
-                    scores[score_name].append(metric(y_test, y_pred,multi_class= average))
-                except Exception as ex:
-                    if verbose > 0:
-                        print("006", model_name, score_name, ex)
-                    scores[score_name].append(np.nan)
+    classes = getattr(model, "classes_", None)
+    metrics_dic = get_classification_metrics(y_test, y_pred, y_score=y_score, classes=classes, score_kind=score_kind, full_metrics=full_metrics, model_name=model_name, hooks=profile_hooks)
+    if verbose > 0 and full_metrics and y_score is None:
+        print("003", model_name, "Proba", "no predict_proba / decision_function")
+
+    if r2 is None:
+        r2 = round(metrics_dic["Accuracy"], 3)
+    scores["R2"].append(r2)
+    for key, val in metrics_dic.items():
+        if key != "Accuracy":
+            scores[key].append(val)
     return scores
 
 def get_metrics_for_model(model_dic, X_test, y_test, full_metrics=0, verbose=0):
@@ -237,8 +1829,65 @@ def get_metrics_for_model(model_dic, X_test, y_test, full_metrics=0, verbose=0):
 # ----------------------------------------------------------------------------------
 #                        MODELS : FIT AND TEST
 # ----------------------------------------------------------------------------------
-def fit_and_test_models(model_list, X_train, Y_train, X_test, Y_test, y_column_name=None, verbose=0, scores=None, metrics=0, transformer=None):
-    
+# Estimateurs qui acceptent une matrice sparse sans la densifier
+SPARSE_CAPABLE_ESTIMATORS = (LogisticRegression, LinearSVC, SGDClassifier, MultinomialNB, BernoulliNB, svm.SVC, DtypePolicyTransformer,
+                             Nystroem, RBFSampler)
+# Métriques du KNN compatibles avec une recherche brute sur matrice sparse
+SPARSE_KNN_METRICS = ("euclidean", "l2", "manhattan", "l1", "cityblock", "cosine")
+
+
+def supports_sparse(model, param_grid=None):
+    """True si model (ou chaque étape d'un Pipeline, ou le modèle encapsulé par un OneVsRestClassifier) accepte du CSR.
+
+    Avec param_grid (ou pour une recherche sur grille), chaque candidat de la grille doit accepter du CSR
+    (ex : un KNN n'accepte pas de sparse pour p >= 3).
+    """
+    if param_grid is not None:
+        model = clone(model)
+        return all(supports_sparse(model.set_params(**params)) for params in ParameterGrid(param_grid))
+    if hasattr(model, "param_grid") and hasattr(model, "estimator"):
+        # GridSearchCV, HalvingGridSearchCV et les recherches de ce module
+        return supports_sparse(model.estimator, model.param_grid)
+    if isinstance(model, BaseSearchCV):
+        # Recherche aléatoire : les candidats ne sont pas énumérables, repli dense
+        return False
+    if isinstance(model, Pipeline):
+        return all(supports_sparse(step) for _, step in model.steps if step not in (None, "passthrough"))
+    if isinstance(model, OneVsRestClassifier):
+        return supports_sparse(model.estimator)
+    if isinstance(model, KNeighborsClassifier):
+        metric = model.metric
+        if metric == "minkowski":
+            metric = {1: "manhattan", 2: "euclidean"}.get(model.p, metric)
+        return model.algorithm in ("auto", "brute") and metric in SPARSE_KNN_METRICS
+    return isinstance(model, SPARSE_CAPABLE_ESTIMATORS)
+
+
+def fit_and_test_models(model_list, X_train, Y_train, X_test, Y_test, y_column_name=None, verbose=0, scores=None, metrics=0, transformer=None, n_jobs=None, timeout=None, cache=None, profile_hooks=None, incremental=None, journal=None, max_rss_mb=None, dtype_policy=None):
+    """Entraîne et évalue chaque modèle de model_list.
+
+    n_jobs  : nombre de processus utilisés pour entraîner les modèles en parallèle (-1 = tous les CPU)
+    timeout : durée maximale (en secondes) accordée à chaque modèle, au-delà le processus est arrêté
+    cache   : ModelCache (ou chemin du répertoire) pour réutiliser les modèles déjà entraînés
+    profile_hooks : hooks de profiling (en plus de PROFILING_HOOKS) appelés à la fin de chaque phase
+    incremental : True (ou dict de paramètres de fit_incremental) pour entraîner par minibatchs les modèles qui supportent partial_fit
+    journal : RunJournal (ou chemin du fichier .jsonl) ; chaque ligne de scores y est écrite dès la fin du modèle
+              et les modèles déjà terminés lors d'une exécution précédente ne sont pas relancés : seuls leurs
+              scores sont repris, ils sont absents du modeldic retourné. Pour récupérer aussi les modèles
+              entraînés, utiliser cache= (sans journal, les modèles en cache sont rechargés sans ré-entraînement)
+    max_rss_mb : mémoire maximale (MB) propre à chaque modèle ; chaque modèle est alors exécuté dans un
+                 processus fils, arrêté si sa mémoire privée (get_process_private_mb, hors pages partagées
+                 avec le processus parent) dépasse cette limite
+    dtype_policy : 'uint8', 'float32', 'float64' ou 'csr' (voir DTYPE_POLICIES) ; X_train et X_test sont convertis
+                   une seule fois pour tous les modèles. En 'csr', les modèles sans support sparse reçoivent
+                   une version dense (calculée une seule fois). Les modèles retournés intègrent la conversion
+                   (DtypePolicyTransformer) et prédisent sur des pixels 0-255 ; avec un transformer, la conversion
+                   est faite avant lui et les modèles prennent, comme sans politique, les données transformées
+    """
+    if isinstance(cache, str):
+        cache = ModelCache(cache)
+    if isinstance(journal, str):
+        journal = RunJournal(journal)
     # Sauvegarde des modèles entrainés
     modeldic = {}
     yt = Y_test
@@ -253,7 +1902,7 @@ def fit_and_test_models(model_list, X_train, Y_train, X_test, Y_test, y_column_n
         yt = Y_test[y_column_name]
         ya = Y_train[y_column_name]
 
-    scorelist = []
+    tasks = []
     for mod_name, model in model_list.items():
         try:
             model_name = mod_name
@@ -261,42 +1910,281 @@ def fit_and_test_models(model_list, X_train, Y_train, X_test, Y_test, y_column_n
                 model_name = y_column_name+"-"+model_name
 
             if isinstance(model, LinearSVC):
-                if ya.nunique() <= 2:
+                if len(np.unique(ya)) <= 2:
                     continue
             scores["Class"].append(y_column_name)
             scores["Model"].append(mod_name)
-            md, score_l = fit_and_test_a_model(model,model_name, X_train, ya, X_test, yt, verbose=verbose, metrics=metrics, transformer=transformer) 
-            modeldic[model_name] = md
-            scorelist.append(score_l)
+            tasks.append((mod_name, model_name, model))
         except Exception as ex:
             print(mod_name, "FAILED : ", ex)
-    
+
+    # Reprise : les modèles déjà terminés d'après le journal ne sont pas relancés
+    all_tasks = tasks
+    score_rows = {}
+    if journal is not None:
+        done = journal.completed()
+        # Empreinte des données calculée une seule fois : les mêmes modèles sur d'autres données sont relancés
+        data_key = "|".join(get_data_fingerprint(data) for data in (X_train, ya, X_test, yt))
+        journal_keys = {model_name: journal.get_key(model_name, model, metrics, transformer, dtype_policy, get_incremental_params(model, incremental), data_key)
+                        for _, model_name, model in tasks}
+        remaining = []
+        for mod_name, model_name, model in tasks:
+            if journal_keys[model_name] in done:
+                score_rows[model_name] = done[journal_keys[model_name]]
+                if verbose:
+                    print(model_name, "already done (journal), model not reloaded")
+            else:
+                remaining.append((mod_name, model_name, model))
+        tasks = remaining
+
+    def record_result(model_name, result):
+        if journal is not None:
+            journal.add(journal_keys[model_name], model_name, result)
+
+    # Le transformer est entraîné une seule fois sur X_train, les données transformées sont partagées par tous les modèles
+    if tasks and transformer is not None and hasattr(transformer, "fit_transform"):
+        try:
+            transformer_policy = get_model_dtype_policy(transformer, dtype_policy)
+            X_train, X_test = fit_transformer_once(transformer, as_model_input(X_train, transformer_policy), as_model_input(X_test, transformer_policy), verbose=verbose, profile_hooks=profile_hooks)
+            transformer = None
+            # Les modèles reçoivent les données transformées, déjà converties
+            dtype_policy = None
+        except Exception as ex:
+            print(type(transformer).__name__, "transform FAILED : ", ex)
+
+    if tasks and dtype_policy is not None:
+        # Conversion faite une seule fois ici : partagée (cache) par tous les modèles, y compris les processus fils.
+        # Les modèles entraînés par minibatchs convertissent chaque minibatch : pas de copie complète de X_train pour eux
+        if any(get_incremental_params(model, incremental) is None for _, _, model in tasks):
+            as_model_input(X_train, dtype_policy)
+        as_model_input(X_test, dtype_policy)
+
+    if (n_jobs is None or n_jobs == 1) and timeout is None and max_rss_mb is None:
+        for mod_name, model_name, model in tasks:
+            try:
+                md, score_l = fit_and_test_a_model(model,model_name, X_train, ya, X_test, yt, verbose=verbose, metrics=metrics, transformer=transformer, cache=cache, profile_hooks=profile_hooks, incremental=incremental, dtype_policy=dtype_policy)
+                modeldic[model_name] = md
+                score_rows[model_name] = score_l
+                record_result(model_name, ("ok", (md, score_l), []))
+            except Exception as ex:
+                print(mod_name, "FAILED : ", ex)
+                record_result(model_name, ("error", ex, []))
+    else:
+        results = _fit_and_test_models_in_processes(tasks, X_train, ya, X_test, yt, verbose=verbose, metrics=metrics, transformer=transformer, n_jobs=n_jobs, timeout=timeout, cache=cache, incremental=incremental,
+                                                    max_rss_mb=max_rss_mb, on_result=record_result, dtype_policy=dtype_policy)
+        # Les enregistrements de profiling des processus fils sont transmis aux hooks du processus parent
+        active_hooks = PROFILING_HOOKS + list(profile_hooks or [])
+        for _, model_name, _ in tasks:
+            for record in results[model_name][2]:
+                for hook in active_hooks:
+                    hook(record)
+        # Les résultats sont restitués dans l'ordre de model_list, quel que soit l'ordre de fin
+        for mod_name, model_name, _ in tasks:
+            status, res, _ = results[model_name]
+            if status == "ok":
+                md, score_l = res
+                modeldic[model_name] = md
+                score_rows[model_name] = score_l
+            else:
+                print(mod_name, "FAILED : ", res)
+
+    # Lignes de scores dans l'ordre de model_list (y compris celles reprises du journal)
+    scorelist = [score_rows[model_name] for _, model_name, _ in all_tasks if model_name in score_rows]
     for score_l in scorelist:
         for key, val in score_l.items():
             scores[key].append(val)    
     
     return modeldic, scores
 
+
+# Données transformées par les derniers transformers entraînés
+TRANSFORMED_DATA_CACHE_SIZE = 2
+_transformed_data_cache = OrderedDict()
+
+
+def fit_transformer_once(transformer, X_train, X_test, verbose=0, profile_hooks=None):
+    """Entraîne transformer sur X_train seulement et transforme X_test avec, sans le ré-entraîner.
+
+    Les matrices obtenues sont en lecture seule et mises en cache : elles sont partagées par tous
+    les modèles, et un nouvel appel avec le même transformer et les mêmes données ne refait rien.
+    Un transformer sans transform (ex : TSNE) ne sait pas projeter de nouveaux points : train et
+    test sont alors projetés ensemble, en un seul fit_transform.
+    """
+    key = (get_estimator_fingerprint(transformer), get_data_fingerprint(X_train), get_data_fingerprint(X_test))
+    cached = _lru_get(_transformed_data_cache, key)
+    if cached is not None:
+        if verbose:
+            print(type(transformer).__name__, "transformed data loaded from cache")
+        return cached
+
+    with profile_phase(type(transformer).__name__, "transform", profile_hooks, n_samples=X_train.shape[0]):
+        if hasattr(transformer, "transform"):
+            X_train_t = transformer.fit_transform(X_train)
+            X_test_t = transformer.transform(X_test)
+        else:
+            X_all = transformer.fit_transform(np.concatenate([np.asarray(X_train), np.asarray(X_test)]))
+            X_train_t, X_test_t = X_all[:X_train.shape[0]], X_all[X_train.shape[0]:]
+    for data in (X_train_t, X_test_t):
+        if isinstance(data, np.ndarray):
+            data.setflags(write=False)
+    if verbose:
+        print(type(transformer).__name__, "After transform : X_train:", X_train_t.shape, "X_test:", X_test_t.shape)
+    _lru_put(_transformed_data_cache, key, (X_train_t, X_test_t), TRANSFORMED_DATA_CACHE_SIZE)
+    return X_train_t, X_test_t
+
+
+def _fit_and_test_a_model_worker(conn, model, model_name, X_train, y_train, X_test, y_test, verbose, metrics, transformer, cache, incremental, dtype_policy):
+    # Exécuté dans le processus fils : le résultat (ou l'erreur) est renvoyé au parent par le pipe,
+    # avec les enregistrements de profiling collectés dans le fils
+    records = []
+    del PROFILING_HOOKS[:]
+    try:
+        res = fit_and_test_a_model(model, model_name, X_train, y_train, X_test, y_test, verbose=verbose, metrics=metrics, transformer=transformer, cache=cache, profile_hooks=[records.append], incremental=incremental, dtype_policy=dtype_policy)
+        conn.send(("ok", res, records))
+    except Exception as ex:
+        conn.send(("error", ex, records))
+    finally:
+        conn.close()
+
+
+RSS_POLL_SECONDS = 0.5
+
+
+def _fit_and_test_models_in_processes(tasks, X_train, y_train, X_test, y_test, verbose=0, metrics=0, transformer=None, n_jobs=None, timeout=None, cache=None, incremental=None, max_rss_mb=None, on_result=None, dtype_policy=None):
+    """on_result(model_name, result) est appelé dans le processus parent dès qu'un modèle se termine (ou est arrêté)."""
+    def store(model_name, result):
+        results[model_name] = result
+        if on_result is not None:
+            on_result(model_name, result)
+
+    if n_jobs is None:
+        n_jobs = 1
+    elif n_jobs < 0:
+        n_jobs = max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+
+    ctx = multiprocessing.get_context()
+    pending = list(tasks)
+    running = {}
+    results = {}
+    while pending or running:
+        # Lancement des modèles tant qu'il reste des workers disponibles
+        while pending and len(running) < n_jobs:
+            mod_name, model_name, model = pending.pop(0)
+            parent_conn, child_conn = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=_fit_and_test_a_model_worker, name=model_name,
+                                  args=(child_conn, model, model_name, X_train, y_train, X_test, y_test, verbose, metrics, transformer, cache, incremental, dtype_policy))
+            process.start()
+            child_conn.close()
+            running[parent_conn] = (model_name, process, time.time())
+            if verbose:
+                print(model_name, "started, pid:", process.pid)
+
+        wait_time = None
+        if timeout is not None:
+            now = time.time()
+            wait_time = max(0, min(start + timeout - now for _, _, start in running.values()))
+        if max_rss_mb is not None:
+            # La mémoire privée des processus fils est surveillée toutes les RSS_POLL_SECONDS secondes
+            wait_time = RSS_POLL_SECONDS if wait_time is None else min(wait_time, RSS_POLL_SECONDS)
+
+        for conn in mp_connection.wait(list(running.keys()), timeout=wait_time):
+            model_name, process, _ = running.pop(conn)
+            try:
+                result = conn.recv()
+            except EOFError:
+                result = ("error", f"process exited with code {process.exitcode}", [])
+            conn.close()
+            process.join()
+            store(model_name, result)
+
+        # Arrêt des modèles qui dépassent la mémoire autorisée
+        if max_rss_mb is not None:
+            for conn, (model_name, process, start) in list(running.items()):
+                # Les pages héritées du parent (fork) et non modifiées ne comptent pas dans la limite
+                rss = get_process_private_mb(process.pid)
+                if rss > max_rss_mb:
+                    process.terminate()
+                    process.join()
+                    conn.close()
+                    del running[conn]
+                    store(model_name, ("error", f"memory limit exceeded : {rss:.0f} MB > {max_rss_mb} MB", []))
+
+        # Arrêt des modèles qui ont dépassé le temps imparti
+        if timeout is not None:
+            now = time.time()
+            for conn, (model_name, process, start) in list(running.items()):
+                if now - start >= timeout:
+                    process.terminate()
+                    process.join()
+                    conn.close()
+                    del running[conn]
+                    store(model_name, ("error", f"timeout after {timeout} s", []))
+    return results
+
 @ignore_warnings(category=ConvergenceWarning)
-def fit_and_test_a_model(model, model_name, X_train, y_train, X_test, y_test, verbose=0, metrics=0, transformer=None):
-    t0 = time.time()
+def fit_and_test_a_model(model, model_name, X_train, y_train, X_test, y_test, verbose=0, metrics=0, transformer=None, cache=None, profile_hooks=None, incremental=None, dtype_policy=None):
+    # Conversion des pixels (partagée par cache), avec repli dense pour les estimateurs qui ne supportent pas le sparse
+    model_policy = get_model_dtype_policy(model, dtype_policy)
+    if transformer is not None:
+        model_policy = get_model_dtype_policy(transformer, model_policy)
+    # Entraînement par minibatchs (partial_fit) : la politique est appliquée à chaque minibatch, X_train
+    # est lu en flux depuis son stockage (uint8, éventuellement mappé en mémoire) sans copie convertie complète
+    incremental_params = get_incremental_params(model, incremental)
+    stream_policy = model_policy if incremental_params is not None and transformer is None else None
+    if stream_policy is None:
+        X_train = as_model_input(X_train, model_policy)
+    X_test = as_model_input(X_test, model_policy)
+    # Le modèle retourné intègre la conversion : il prédit sur des pixels 0-255 (sauf avec un transformer,
+    # dont il prend les données transformées)
+    fitted_model = with_dtype_policy(model, model_policy) if transformer is None else model
+    # Modèle déjà entraîné sur ces données : on récupère directement le modèle et ses scores
+    cache_key = None
+    if cache is not None:
+        if isinstance(cache, str):
+            cache = ModelCache(cache)
+        cache_key = cache.get_key(fitted_model, X_train, y_train, X_test, y_test, transformer=transformer, metrics=metrics,
+                                  incremental=get_incremental_params(model, incremental))
+        cached = cache.get(cache_key)
+        if cached is not None:
+            if verbose:
+                print(model_name, "loaded from cache", cache_key)
+            cached_model, modeldic_score = cached
+            modeldic_score["Modeli"] = model_name
+            return cached_model, modeldic_score
+
+    t0 = time.perf_counter()
     if verbose:
         print(model_name, "X_train:", X_train.shape,"y_train:", y_train.shape, "X_test:", X_test.shape,"y_test:", y_test.shape)
 
     if transformer is not None:
         try:
-            X_train = transformer.fit_transform(X_train)
-            X_test = transformer.fit_transform(X_test)
+            X_train, X_test = fit_transformer_once(transformer, X_train, X_test, profile_hooks=profile_hooks)
             if verbose:
                 print(model_name, "After transform : X_train:", X_train.shape,"y_train:", y_train.shape, "X_test:", X_test.shape,"y_test:", y_test.shape)
-        except:
-            pass
-    model.fit(X_train, y_train)
-    
-    r2 = model.score(X_test, y_test)
+        except Exception as ex:
+            if verbose:
+                print(model_name, "transform FAILED : ", ex)
+    # Entraînement par minibatchs (partial_fit) : incremental=True ou dict de paramètres de fit_incremental
+    if incremental_params is not None:
+        with profile_phase(model_name, "fit", profile_hooks, n_samples=X_train.shape[0]):
+            fit_incremental(model, X_train, y_train, verbose=verbose, model_name=model_name, profile_hooks=profile_hooks, dtype_policy=stream_policy, **incremental_params)
+    else:
+        with profile_phase(model_name, "fit", profile_hooks, n_samples=X_train.shape[0]):
+            model.fit(X_train, y_train)
+    t_fit = (time.perf_counter() - t0)
+
+    # Une seule inférence sur X_test : labels (et scores si métriques complètes) réutilisés pour toutes les métriques
+    full = metrics > 1
+    if isinstance(model, PredictableTSNE):
+        y_pred, y_score, score_kind, t_predict = None, None, None, 0
+        with profile_phase(model_name, "score", profile_hooks, n_samples=X_test.shape[0]):
+            r2 = model.score(X_test, y_test)
+    else:
+        y_pred, y_score, score_kind, t_predict = predict_labels_and_scores(model, X_test, with_scores=full, transformer=transformer, model_name=model_name, hooks=profile_hooks)
+        r2 = np.mean(np.asarray(y_pred) == np.asarray(y_test))
     if verbose:
         print(model_name+" "*(20-len(model_name))+":", round(r2, 3))
-    t_model = (time.time() - t0)
+    t_model = t_fit if metrics > 0 else t_fit + t_predict
         
     # Sauvegarde des scores
     modeldic_score = {"Modeli":model_name,
@@ -306,18 +2194,448 @@ def fit_and_test_a_model(model, model_name, X_train, y_train, X_test, y_test, ve
     
     # Calcul et Sauvegarde des métriques
     if metrics > 0:
-        full=metrics > 1
-        t0 = time.time()
-        model_metrics = get_metrics_for_the_model(model, X_test, y_test, y_pred=None,scores=None, model_name=model_name, r2=r2, full_metrics=full, verbose=verbose, transformer=transformer)
-        t_model = (time.time() - t0)   
+        t0 = time.perf_counter()
+        model_metrics = get_metrics_for_the_model(model, X_test, y_test, y_pred=y_pred,scores=None, model_name=model_name, r2=r2, full_metrics=full, verbose=verbose, transformer=transformer, y_score=y_score, score_kind=score_kind, profile_hooks=profile_hooks)
+        t_model = (time.perf_counter() - t0)   
         modeldic_score["metrics time"] = time.strftime("%H:%M:%S", time.gmtime(t_model))
         modeldic_score["metrics seconde"] = t_model
+        if y_pred is not None:
+            modeldic_score["predict time"] = time.strftime("%H:%M:%S", time.gmtime(t_predict))
+            modeldic_score["predict seconde"] = t_predict
 
         for key, val in model_metrics.items():
             if "R2" not in key and "Model" not in key:
                 modeldic_score[key] = val[0]
 
-    return model, modeldic_score
+    if cache_key is not None:
+        cache.put(cache_key, fitted_model, modeldic_score)
+    return fitted_model, modeldic_score
+
+
+def data_format_report(model_list, X_train, y_train, X_test, y_test, formats=("float64", "float32", "uint8", "csr"), metrics=0, verbose=0):
+    """Compare pour chaque modèle les formats de données (politiques de DTYPE_POLICIES) :
+    taille des données, temps de fit et de prédiction, précision, mémoire économisée et
+    accélérations (fit, prédiction et total fit + prédiction) par rapport au premier format de formats.
+
+    En 'csr', la colonne "sparse input" indique si le modèle a reçu la matrice sparse ou la version dense de repli.
+    """
+    rows = []
+    for data_format in formats:
+        X_tr, X_te = as_model_input(X_train, data_format), as_model_input(X_test, data_format)
+        size = data_size_mb(X_tr) + data_size_mb(X_te)
+        for model_name, model in model_list.items():
+            sparse_input = sparse.issparse(X_tr) and supports_sparse(model)
+            model_size = size
+            if sparse.issparse(X_tr) and not sparse_input:
+                model_size = data_size_mb(as_model_input(X_train, "float32")) + data_size_mb(as_model_input(X_test, "float32"))
+            row = {"Model": model_name, "format": data_format, "dtype": str(getattr(X_tr, "dtype", "")), "sparse input": sparse_input, "data MB": model_size}
+            try:
+                # metrics >= 1 : "fit seconde" ne contient alors que le fit et "predict seconde" est renseigné
+                _, score_l = fit_and_test_a_model(clone(model), model_name, X_train, y_train, X_test, y_test, verbose=verbose, metrics=max(metrics, 1), dtype_policy=data_format)
+                predict_seconds = score_l.get("predict seconde", 0.0)
+                row.update({"total seconde": score_l["fit seconde"] + predict_seconds,
+                            "fit seconde": score_l["fit seconde"],
+                            "predict seconde": predict_seconds,
+                            "R2": score_l["R2"]})
+            except Exception as ex:
+                print(model_name, data_format, "FAILED : ", ex)
+            rows.append(row)
+    df = pd.DataFrame(rows)
+    if "total seconde" in df:
+        # Comparaison avec le premier format (référence)
+        reference = df[df["format"] == formats[0]].set_index("Model")
+        df["memory saved MB"] = df["Model"].map(reference["data MB"]) - df["data MB"]
+        df["fit speedup"] = df["Model"].map(reference["fit seconde"]) / df["fit seconde"]
+        df["predict speedup"] = df["Model"].map(reference["predict seconde"]) / df["predict seconde"]
+        df["speedup"] = df["Model"].map(reference["total seconde"]) / df["total seconde"]
+    return df
+
+
+# ----------------------------------------------------------------------------------
+#                        MODELS : CACHE
+# ----------------------------------------------------------------------------------
+def get_data_fingerprint(data):
+    """Empreinte (hash) du contenu d'un tableau numpy, d'un DataFrame/Series ou d'une matrice sparse."""
+    h = hashlib.blake2b(digest_size=16)
+    if data is None:
+        h.update(b"None")
+        return h.hexdigest()
+    if hasattr(data, "to_numpy"):
+        data = data.to_numpy()
+    if hasattr(data, "tocsr") and hasattr(data, "indptr"):
+        h.update(f"sparse{data.shape}".encode())
+        for part in (data.data, data.indices, data.indptr):
+            h.update(get_data_fingerprint(part).encode())
+        return h.hexdigest()
+    if isinstance(data, np.ndarray) and data.dtype != object:
+        h.update(f"{data.shape}{data.dtype.str}".encode())
+        h.update(memoryview(np.ascontiguousarray(data)).cast("B"))
+        return h.hexdigest()
+    h.update(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    return h.hexdigest()
+
+
+def _fingerprint_value(value):
+    # Les estimateurs imbriqués et les tableaux sont résumés pour obtenir une clé stable
+    if hasattr(value, "get_params") and not isinstance(value, type):
+        return get_estimator_fingerprint(value)
+    if isinstance(value, np.ndarray):
+        return get_data_fingerprint(value)
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{k!r}: {_fingerprint_value(v)}" for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_fingerprint_value(v) for v in value) + "]"
+    return repr(value)
+
+
+def get_estimator_fingerprint(estimator):
+    """Empreinte d'un estimateur : classe + get_params() (sans tenir compte de l'état entraîné)."""
+    cls = type(estimator)
+    desc = f"{cls.__module__}.{cls.__qualname__}"
+    if hasattr(estimator, "get_params"):
+        desc += _fingerprint_value(estimator.get_params(deep=False))
+    else:
+        desc += repr(estimator)
+    return hashlib.blake2b(desc.encode(), digest_size=16).hexdigest()
+
+
+class ModelCache:
+    """Cache disque des modèles entraînés et de leurs scores, adressé par le contenu.
+
+    La clé combine la classe et les paramètres de l'estimateur, l'empreinte des données
+    (et du transformer s'il y en a un). Au delà de max_size_mb, les entrées les moins
+    récemment utilisées sont supprimées.
+    """
+
+    def __init__(self, path="model_cache", max_size_mb=4096):
+        self.path = path
+        self.max_size_mb = max_size_mb
+        os.makedirs(path, exist_ok=True)
+
+    def get_key(self, model, X_train, y_train, X_test=None, y_test=None, transformer=None, metrics=0, incremental=None):
+        """incremental : paramètres de fit_incremental si le modèle est entraîné par partial_fit (get_incremental_params)."""
+        parts = [get_estimator_fingerprint(model),
+                 get_data_fingerprint(X_train), get_data_fingerprint(y_train),
+                 get_data_fingerprint(X_test), get_data_fingerprint(y_test),
+                 "metrics"+str(metrics)]
+        if transformer is not None:
+            parts.append(get_estimator_fingerprint(transformer))
+        if incremental is not None:
+            parts.append("incremental"+_fingerprint_value(incremental))
+        return hashlib.blake2b("|".join(parts).encode(), digest_size=20).hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key+".pkl")
+
+    def get(self, key):
+        file_path = self._file(key)
+        try:
+            with open(file_path, "rb") as f:
+                model, modeldic_score = pickle.load(f)
+            # Mise à jour de la date d'accès pour l'éviction LRU
+            os.utime(file_path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        return model, modeldic_score
+
+    def put(self, key, model, modeldic_score):
+        file_path = self._file(key)
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((model, dict(modeldic_score)), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, file_path)
+        self.evict()
+
+    def entries(self):
+        entries = []
+        for file_name in os.listdir(self.path):
+            if file_name.endswith(".pkl"):
+                try:
+                    st = os.stat(os.path.join(self.path, file_name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, file_name[:-4]))
+        return sorted(entries)
+
+    def size_mb(self):
+        return sum(size for _, size, _ in self.entries()) / 1024**2
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        max_size = self.max_size_mb * 1024**2
+        for _, size, key in entries:
+            if total <= max_size:
+                break
+            try:
+                os.remove(self._file(key))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, key in self.entries():
+            os.remove(self._file(key))
+
+
+# ----------------------------------------------------------------------------------
+#                        MODELS : JOURNAL DES EXECUTIONS
+# ----------------------------------------------------------------------------------
+class RunJournal:
+    """Journal JSONL en ajout seul : une ligne par modèle terminé, écrite (et synchronisée sur disque) dès sa fin.
+
+    Après un arrêt brutal (OOM, kernel tué...), une nouvelle exécution de fit_and_test_models avec le
+    même journal reprend les lignes de scores des modèles déjà terminés au lieu de les relancer.
+    """
+
+    def __init__(self, path="run_journal.jsonl"):
+        self.path = path
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+
+    def get_key(self, model_name, model, metrics=0, transformer=None, dtype_policy=None, incremental=None, data_key=None):
+        """data_key : empreinte de X_train, y_train, X_test et y_test (get_data_fingerprint), calculée une fois par exécution."""
+        # Un modèle dont les paramètres (ou ceux du transformer, le mode d'entraînement, les données) ont changé est relancé
+        key = f"{model_name}|{get_estimator_fingerprint(model)}|metrics{metrics}"
+        if data_key is not None:
+            key += f"|{data_key}"
+        if transformer is not None:
+            key += f"|{get_estimator_fingerprint(transformer)}"
+        if dtype_policy is not None:
+            key += f"|{dtype_policy}"
+        if incremental is not None:
+            key += f"|incremental{_fingerprint_value(incremental)}"
+        return key
+
+    def add(self, key, model_name, result):
+        status, res, _ = result
+        entry = {"key": key, "model": model_name, "status": status, "date": time.strftime("%Y-%m-%d %H:%M:%S")}
+        if status == "ok":
+            entry["scores"] = _json_value(res[1])
+        else:
+            entry["error"] = str(res)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def entries(self):
+        entries = []
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Dernière ligne incomplète si l'écriture a été interrompue
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def completed(self):
+        """{clé: ligne de scores} des modèles terminés avec succès (la dernière entrée l'emporte)."""
+        done = {}
+        for entry in self.entries():
+            if entry.get("status") == "ok":
+                done[entry["key"]] = {key: np.nan if val is None else val for key, val in entry["scores"].items()}
+        return done
+
+    def failed(self):
+        done = self.completed()
+        return [entry for entry in self.entries() if entry.get("status") != "ok" and entry["key"] not in done]
+
+
+# ----------------------------------------------------------------------------------
+#                        MODELS : SAUVEGARDE
+# ----------------------------------------------------------------------------------
+def save_models(model_dic, path="modeldic.pkl"):
+    """Enregistre un dictionnaire {nom: modèle entraîné} (ex : modeldic_full) dans un fichier pickle."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(dict(model_dic), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_models(path="modeldic.pkl", model_names=None):
+    """Recharge un dictionnaire de modèles enregistré par save_models (uniquement model_names si précisé)."""
+    with open(path, "rb") as f:
+        model_dic = pickle.load(f)
+    if model_names is not None:
+        missing = [name for name in model_names if name not in model_dic]
+        if missing:
+            raise KeyError(f"Unknown models : {missing}, available : {list(model_dic)}")
+        model_dic = {name: model_dic[name] for name in model_names}
+    return model_dic
+
+
+REGISTRY_MIN_ARRAY_BYTES = 64 * 1024
+
+
+def _json_value(value):
+    # Conversion des paramètres / scores en valeurs JSON (repr pour les objets)
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _json_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    return repr(value)
+
+
+def get_score_row(scores, model_name):
+    """Ligne de scores du modèle model_name dans le résultat de fit_and_test_models (dict de listes ou DataFrame)."""
+    if scores is None:
+        return {}
+    if isinstance(scores, dict) and "Model" not in scores:
+        return dict(scores)
+    df = scores if isinstance(scores, pd.DataFrame) else pd.DataFrame(scores)
+    rows = df[df["Model"] == model_name]
+    return rows.iloc[-1].to_dict() if len(rows) else {}
+
+
+class _ArrayPickler(pickle.Pickler):
+    # Les grands tableaux numériques sont écrits à part en .npy, le pickle ne garde que leur nom de fichier
+    def __init__(self, file, array_dir, min_bytes):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.array_dir = array_dir
+        self.min_bytes = min_bytes
+        self.arrays = {}
+
+    def persistent_id(self, obj):
+        # np.memmap compris : un modèle chargé depuis le registre se ré-enregistre avec ses .npy
+        # (les autres sous-classes, ex : np.matrix, perdraient leur type dans un .npy)
+        if type(obj) not in (np.ndarray, np.memmap) or obj.dtype.hasobject or obj.nbytes < self.min_bytes:
+            return None
+        file_name = self.arrays.get(id(obj), (None,))[0]
+        if file_name is None:
+            file_name = f"array_{len(self.arrays)}.npy"
+            np.save(os.path.join(self.array_dir, file_name), obj)
+            # Référence gardée pour que id(obj) ne soit pas réutilisé pendant la sauvegarde
+            self.arrays[id(obj)] = (file_name, obj)
+        return file_name
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    def __init__(self, file, array_dir, mmap_mode):
+        super().__init__(file)
+        self.array_dir = array_dir
+        self.mmap_mode = mmap_mode
+        self.arrays = {}
+
+    def persistent_load(self, file_name):
+        if file_name not in self.arrays:
+            self.arrays[file_name] = np.load(os.path.join(self.array_dir, file_name), mmap_mode=self.mmap_mode)
+        return self.arrays[file_name]
+
+
+class ModelRegistry:
+    """Registre des modèles entraînés : un répertoire par modèle avec model.pkl, meta.json (scores et paramètres)
+    et les grands tableaux (vecteurs supports, matrice d'entraînement du KNN, coefficients...) en fichiers .npy.
+
+    Au chargement, les tableaux sont mappés en mémoire (mmap_mode='c' : copie à l'écriture) : le chargement
+    est quasi immédiat et les pages sont partagées entre les processus qui chargent le même modèle.
+    """
+
+    def __init__(self, path="model_registry", mmap_mode="c", min_array_bytes=REGISTRY_MIN_ARRAY_BYTES):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        self.min_array_bytes = min_array_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def _dir(self, model_name):
+        slug = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+        return os.path.join(self.path, f"{slug}-{hashlib.blake2b(model_name.encode(), digest_size=4).hexdigest()}")
+
+    def save(self, model_name, model, scores=None, extra=None):
+        """Enregistre model sous model_name (remplace l'entrée existante) ; scores : ligne de scores ou résultat de fit_and_test_models."""
+        model_dir = self._dir(model_name)
+        tmp_dir = f"{model_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        with open(os.path.join(tmp_dir, "model.pkl"), "wb") as f:
+            pickler = _ArrayPickler(f, tmp_dir, self.min_array_bytes)
+            pickler.dump(model)
+        meta = {"name": model_name,
+                "class": f"{type(model).__module__}.{type(model).__qualname__}",
+                "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "timestamp": time.time(),
+                "params": _json_value(model.get_params(deep=False)) if hasattr(model, "get_params") else None,
+                "scores": _json_value(get_score_row(scores, model_name)),
+                "arrays": {file_name: list(obj.shape) for file_name, obj in pickler.arrays.values()},
+                "extra": _json_value(extra or {})}
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        shutil.rmtree(model_dir, ignore_errors=True)
+        os.replace(tmp_dir, model_dir)
+        return model_dir
+
+    def save_all(self, model_dic, scores=None):
+        """Enregistre tous les modèles d'un dictionnaire (ex : modeldic_full) avec leurs lignes de scores."""
+        return [self.save(model_name, model, scores) for model_name, model in model_dic.items()]
+
+    def meta(self, model_name):
+        with open(os.path.join(self._dir(model_name), "meta.json")) as f:
+            return json.load(f)
+
+    def load(self, model_name, mmap_mode=None):
+        model_dir = self._dir(model_name)
+        if not os.path.exists(os.path.join(model_dir, "meta.json")):
+            raise KeyError(f"Unknown model : {model_name}")
+        with open(os.path.join(model_dir, "model.pkl"), "rb") as f:
+            return _ArrayUnpickler(f, model_dir, mmap_mode or self.mmap_mode).load()
+
+    def load_all(self, model_names=None, mmap_mode=None):
+        if model_names is None:
+            model_names = self.names()
+        return {model_name: self.load(model_name, mmap_mode=mmap_mode) for model_name in model_names}
+
+    def _metas(self):
+        metas = []
+        for dir_name in os.listdir(self.path):
+            try:
+                with open(os.path.join(self.path, dir_name, "meta.json")) as f:
+                    meta = json.load(f)
+            except (FileNotFoundError, NotADirectoryError, json.JSONDecodeError):
+                continue
+            meta["size MB"] = sum(entry.stat().st_size for entry in os.scandir(os.path.join(self.path, dir_name))) / 1024**2
+            metas.append(meta)
+        return sorted(metas, key=lambda meta: meta["timestamp"])
+
+    def names(self):
+        return [meta["name"] for meta in self._metas()]
+
+    def list(self):
+        """DataFrame des modèles enregistrés : nom, classe, date, taille et scores."""
+        rows = [dict({"Model": meta["name"], "class": meta["class"], "date": meta["date"], "size MB": meta["size MB"]},
+                     **{key: val for key, val in meta["scores"].items() if key != "Model"})
+                for meta in self._metas()]
+        return pd.DataFrame(rows)
+
+    def delete(self, model_name):
+        model_dir = self._dir(model_name)
+        if not os.path.exists(model_dir):
+            raise KeyError(f"Unknown model : {model_name}")
+        shutil.rmtree(model_dir)
+
+    def prune(self, max_age_days=None, keep=None):
+        """Supprime les entrées plus anciennes que max_age_days et/ou ne garde que les keep plus récentes."""
+        metas = self._metas()
+        deleted = []
+        if keep is not None:
+            deleted.extend(metas[:max(len(metas) - keep, 0)])
+        if max_age_days is not None:
+            limit = time.time() - max_age_days * 24 * 3600
+            deleted.extend(meta for meta in metas if meta["timestamp"] < limit and meta not in deleted)
+        for meta in deleted:
+            self.delete(meta["name"])
+        return [meta["name"] for meta in deleted]
 
 
 # ----------------------------------------------------------------------------------
@@ -344,7 +2662,7 @@ def color_graph_background(ligne=1, colonne=1):
     return figure, axes
 
 
-def draw_and_get_svm_svc(X_train, y_train, X_test=None, y_test=None, svc=None, kernel='rbf', C = 1.0, gamma="scale", h = None, xlabel=None, ylabel=None, title=None):
+def draw_and_get_svm_svc(X_train, y_train, X_test=None, y_test=None, svc=None, kernel='rbf', C = 1.0, gamma="scale", h = None, xlabel=None, ylabel=None, title=None, batch_size=None, n_jobs=None):
 
     if svc is None:
         svc = svm.SVC(kernel=kernel, C=C, gamma=gamma).fit(X_train, y_train)
@@ -359,7 +2677,7 @@ def draw_and_get_svm_svc(X_train, y_train, X_test=None, y_test=None, svc=None, k
     xx, yy = np.meshgrid(np.arange(x_min, x_max, h), np.arange(y_min, y_max, h))
 
     # Surface de décision
-    Z = svc.predict(np.c_[xx.ravel(), yy.ravel()])
+    Z = batch_predict(svc, np.c_[xx.ravel(), yy.ravel()], batch_size=batch_size, n_jobs=n_jobs)
     Z = Z.reshape(xx.shape)
     plt.contourf(xx, yy, Z, cmap=plt.cm.coolwarm, alpha=0.8)
 
@@ -381,70 +2699,251 @@ def draw_and_get_svm_svc(X_train, y_train, X_test=None, y_test=None, svc=None, k
     return svc
 
 
+DIGIT_SIZE = 28
+
+
+def digits_montage(X, nb_cols=10, padding=1, pad_value=0):
+    """Assemble les chiffres de X (n, 784) en une seule image (mosaïque de nb_cols colonnes).
+
+    Un seul reshape / transpose, sans boucle sur les chiffres.
+    """
+    X = X.to_numpy() if hasattr(X, "to_numpy") else np.asarray(X)
+    digits = X.reshape(-1, DIGIT_SIZE, DIGIT_SIZE)
+    n = digits.shape[0]
+    nb_cols = max(min(nb_cols, n), 1)
+    nb_lignes = -(-n // nb_cols)
+    cell = DIGIT_SIZE + padding
+    montage = np.full((nb_lignes * nb_cols, cell, cell), pad_value, dtype=digits.dtype)
+    montage[:n, :DIGIT_SIZE, :DIGIT_SIZE] = digits
+    montage = montage.reshape(nb_lignes, nb_cols, cell, cell).transpose(0, 2, 1, 3).reshape(nb_lignes * cell, nb_cols * cell)
+    # Pas de marge après la dernière ligne / colonne
+    return montage[:nb_lignes * cell - padding, :nb_cols * cell - padding]
+
+
+def save_digits_montage(X, path, nb_cols=100, padding=1, cmap="afmhot"):
+    """Écrit la mosaïque des chiffres directement dans un fichier PNG (sans figure matplotlib)."""
+    plt.imsave(path, digits_montage(X, nb_cols=nb_cols, padding=padding), cmap=cmap)
+    return path
+
+
+def draw_digits_montage(X, y=None, nb_cols=10, padding=1, cmap="afmhot", title=None, cell_inches=0.5, label_color="cyan"):
+    """Affiche la mosaïque des chiffres avec un seul imshow ; y (optionnel) est écrit en haut à gauche de chaque case."""
+    montage = digits_montage(X, nb_cols=nb_cols, padding=padding)
+    cell = DIGIT_SIZE + padding
+    nb_lignes, nb_cols = (montage.shape[0] + padding) // cell, (montage.shape[1] + padding) // cell
+    figure, axe = color_graph_background(1, 1)
+    figure.set_size_inches(max(nb_cols * cell_inches, 4), max(nb_lignes * cell_inches, 1), forward=True)
+    axe.imshow(montage, interpolation="none", cmap=cmap)
+    if y is not None:
+        y = y.to_numpy() if hasattr(y, "to_numpy") else np.asarray(y)
+        for i, label in enumerate(y[:nb_lignes * nb_cols]):
+            axe.text((i % nb_cols) * cell + 1, (i // nb_cols) * cell + 1, str(label), color=label_color,
+                     fontsize=8, ha="left", va="top")
+    axe.axis("off")
+    if title:
+        axe.set_title(title)
+    return figure, axe
+
+
 def show_digit(some_digit, y):
-    some_digit_image = some_digit.reshape(28, 28)
+    # Plusieurs chiffres : mosaïque en un seul imshow
+    if np.size(some_digit) > DIGIT_SIZE * DIGIT_SIZE:
+        draw_digits_montage(some_digit, y=y if np.ndim(y) > 0 else None, title=None if np.ndim(y) > 0 else y)
+        return
+    some_digit_image = np.asarray(some_digit).reshape(28, 28)
     color_graph_background(1,1)
     plt.imshow(some_digit_image, interpolation = "none", cmap = "afmhot")
     plt.title(y)
     plt.axis("off")
 
 
-def draw_digits(df, y=None, nb=None):
+def draw_digits(df, y=None, nb=None, montage=False):
     
     # plot some of the numbers
     if nb is None:
         nb = df.shape[0]
 
+    if montage:
+        # Une seule image pour tous les chiffres : utilisable pour des milliers de chiffres
+        X = df.iloc[:nb] if hasattr(df, "iloc") else df[:nb]
+        # Mosaïque à peu près carrée au delà de 100 chiffres
+        nb_cols = 10 if nb <= 100 else int(np.ceil(np.sqrt(nb)))
+        draw_digits_montage(X, y=None if y is None else y[:nb], nb_cols=nb_cols)
+        plt.show()
+        return
+
     nb_cols = 10
     nb_lignes = (nb//nb_cols)
 
     plt.figure(figsize=(14,(nb_lignes*1.5)))
     for digit_num in range(0,nb):
         plt.subplot(nb_lignes,nb_cols,digit_num+1)
-        grid_data = df.iloc[digit_num].values.reshape(28,28)  # reshape from 1d to 2d pixel array
+        digit = df.iloc[digit_num].values if hasattr(df, "iloc") else df[digit_num]
+        grid_data = np.asarray(digit).reshape(28,28)  # reshape from 1d to 2d pixel array
         plt.imshow(grid_data, interpolation = "none", cmap = "afmhot")
         if y is not None:
-            plt.title(y.iloc[digit_num])
+            plt.title(y.iloc[digit_num] if hasattr(y, "iloc") else y[digit_num])
         plt.axis("off")
     plt.tight_layout()
     plt.show()
 
-from sklearn.manifold import Isomap
+import matplotlib as mat
+from sklearn.manifold import Isomap, TSNE
+from sklearn.neighbors import KNeighborsRegressor
+
+PROJECTION_CACHE_SIZE = 8
+_projection_2d_cache = OrderedDict()
+
+
+def _get_projector(method, n_components=2, random_state=0, **params):
+    if method == "isomap":
+        return Isomap(n_components=n_components, **params)
+    if method == "tsne":
+        return TSNE(n_components=n_components, random_state=random_state, **params)
+    if method == "pca":
+        return PCA(n_components=n_components, random_state=random_state, **params)
+    raise ValueError(f"Unknown projection method : {method}")
+
+
+def get_projection(X, method="isomap", n_components=2, n_landmarks=None, n_neighbors=5, random_state=0, cache=True, **params):
+    """Projection 2-D de X pour les graphiques, mise en cache par (empreinte de X, méthode, paramètres).
+
+    Avec n_landmarks, la méthode n'est entraînée que sur n_landmarks points tirés au hasard et les autres
+    points sont projetés hors échantillon : Isomap.transform pour isomap et pca, régression KNN
+    (n_neighbors voisins parmi les landmarks, dans l'espace d'origine) pour tsne qui n'a pas de transform.
+    """
+    X = X.to_numpy() if hasattr(X, "to_numpy") else X
+    key = None
+    if cache:
+        key = (get_data_fingerprint(X), method, n_components, n_landmarks, n_neighbors, random_state, _fingerprint_value(params))
+        projection = _lru_get(_projection_2d_cache, key)
+        if projection is not None:
+            return projection
+
+    projector = _get_projector(method, n_components=n_components, random_state=random_state, **params)
+    if n_landmarks is None or n_landmarks >= X.shape[0]:
+        projection = projector.fit_transform(X)
+    else:
+        landmarks = np.sort(np.random.RandomState(random_state).choice(X.shape[0], n_landmarks, replace=False))
+        X_landmarks = np.asarray(X[landmarks], dtype=np.float64)
+        landmark_projection = projector.fit_transform(X_landmarks)
+        if hasattr(projector, "transform"):
+            projection = batch_predict(projector, X, method="transform")
+        else:
+            knn = KNeighborsRegressor(n_neighbors=n_neighbors, weights="distance").fit(X_landmarks, landmark_projection)
+            projection = batch_predict(knn, X)
+        # Les landmarks gardent leur position exacte
+        projection[landmarks] = landmark_projection
+
+    projection.setflags(write=False)
+    if cache:
+        _lru_put(_projection_2d_cache, key, projection, PROJECTION_CACHE_SIZE)
+    return projection
+
+
+N_DIGIT_CLASSES = 10
+DENSITY_BINS = 300
+
+
+def _digit_cmap_and_norm(n_classes=N_DIGIT_CLASSES):
+    # Une couleur par chiffre, centrée sur les valeurs entières
+    cmap = plt.get_cmap('viridis', n_classes)
+    norm = mat.colors.Normalize(vmin=-0.5, vmax=n_classes - 0.5)
+    return cmap, norm
+
+
+def _digit_colorbar(figure, axe, n_classes=N_DIGIT_CLASSES):
+    cmap, norm = _digit_cmap_and_norm(n_classes)
+    figure.colorbar(mat.cm.ScalarMappable(norm=norm, cmap=cmap), ax=axe, ticks=range(n_classes))
+
+
+def _class_codes(labels):
+    labels = labels.to_numpy() if hasattr(labels, "to_numpy") else np.asarray(labels)
+    if np.issubdtype(labels.dtype, np.number):
+        return labels.astype(np.int64)
+    try:
+        return labels.astype(np.int64)
+    except ValueError:
+        return np.unique(labels, return_inverse=True)[1]
+
+
+def density_raster(projection, labels, n_classes=N_DIGIT_CLASSES, bins=DENSITY_BINS, extent=None):
+    """Histogramme 2-D par classe des points projetés : tableau (n_classes, bins, bins) calculé par un seul np.bincount.
 
-def draw_predict(X, y, y_pred, title="", projection=None, c=None):
+    extent = (x_min, x_max, y_min, y_max), par défaut les bornes de projection.
+    """
+    projection = np.asarray(projection)
+    codes = _class_codes(labels)
+    if extent is None:
+        extent = (projection[:, 0].min(), projection[:, 0].max(), projection[:, 1].min(), projection[:, 1].max())
+    x_min, x_max, y_min, y_max = extent
+    ix = np.clip(((projection[:, 0] - x_min) / ((x_max - x_min) or 1) * bins).astype(np.int64), 0, bins - 1)
+    iy = np.clip(((projection[:, 1] - y_min) / ((y_max - y_min) or 1) * bins).astype(np.int64), 0, bins - 1)
+    keep = (codes >= 0) & (codes < n_classes)
+    flat = (codes[keep] * bins + iy[keep]) * bins + ix[keep]
+    counts = np.bincount(flat, minlength=n_classes * bins * bins).reshape(n_classes, bins, bins)
+    return counts, extent
+
+
+def density_rgb(counts, n_classes=N_DIGIT_CLASSES):
+    """Image RGB (bins, bins, 3) : couleur moyenne des classes présentes dans chaque case,
+    intensité en log du nombre de points, fond blanc."""
+    cmap, norm = _digit_cmap_and_norm(n_classes)
+    colors = cmap(norm(np.arange(counts.shape[0])))[:, :3]
+    total = counts.sum(axis=0)
+    mean_color = np.tensordot(counts, colors, axes=(0, 0)) / np.maximum(total, 1)[..., None]
+    intensity = np.log1p(total) / np.log1p(max(total.max(), 1))
+    return 1 - intensity[..., None] * (1 - mean_color)
+
+
+def _draw_density(axe, projection, labels, bins=DENSITY_BINS, extent=None):
+    counts, extent = density_raster(projection, labels, bins=bins, extent=extent)
+    axe.imshow(density_rgb(counts), extent=extent, origin="lower", aspect="auto", interpolation="nearest")
+    return extent
+
+
+def draw_predict(X, y, y_pred, title="", projection=None, c=None, method="isomap", n_landmarks=None, mode="scatter", bins=DENSITY_BINS):
+    """mode='density' : les points sont agrégés par classe en histogramme 2-D et affichés en une seule image
+    (temps de rendu constant quel que soit le nombre de points)."""
     if projection is None:
-        iso = Isomap(n_components=2)
-        projection = iso.fit_transform(X)
+        projection = get_projection(X, method=method, n_landmarks=n_landmarks)
     figure, axe = color_graph_background()
 
     # Pour appliquer la couleur de y
     if c is None:
         c = y
 
-    # ['viridis', 'cubehelix', 'plasma', 'inferno', 'magma', 'cividis']
-    if y is not None:
-        axe.scatter(projection[:, 0], projection[:, 1], label="Test", lw=0.2, c=c, cmap=plt.cm.get_cmap('viridis', 10))
-        
-    if y_pred is not None:
-        axe.scatter(projection[:, 0], projection[:, 1], label="predict", marker='P', lw=0.5, c=c, cmap=plt.cm.get_cmap('viridis', 10))
-    
-    pcm = axe.pcolormesh(np.random.random((20, 20)) * 11, cmap=plt.cm.get_cmap('viridis', 10))
-    figure.colorbar(pcm, ax=axe)
-    plt.legend()
+    cmap, norm = _digit_cmap_and_norm()
+    if mode == "density":
+        _draw_density(axe, projection, c if c is not None else y_pred, bins=bins)
+    else:
+        # ['viridis', 'cubehelix', 'plasma', 'inferno', 'magma', 'cividis']
+        if y is not None:
+            axe.scatter(projection[:, 0], projection[:, 1], label="Test", lw=0.2, c=c, cmap=cmap, norm=norm)
+
+        if y_pred is not None:
+            axe.scatter(projection[:, 0], projection[:, 1], label="predict", marker='P', lw=0.5, c=c, cmap=cmap, norm=norm)
+        plt.legend()
+
+    _digit_colorbar(figure, axe)
     figure.set_size_inches(10, 10, forward=True)
     figure.set_dpi(100)
     plt.title(title)
 
 
-def draw_all_predict(X, y, y_pred, title="Représentation des prédictions", projection=None, c=None):
+def draw_all_predict(X, y, y_pred, title="Représentation des prédictions", projection=None, c=None, method="isomap", n_landmarks=None, mode="scatter", bins=DENSITY_BINS):
     if projection is None:
-        iso = Isomap(n_components=2)
-        projection = iso.fit_transform(X)
+        projection = get_projection(X, method=method, n_landmarks=n_landmarks)
+    y = y.to_numpy() if hasattr(y, "to_numpy") else np.asarray(y)
+    y_pred = y_pred.to_numpy() if hasattr(y_pred, "to_numpy") else np.asarray(y_pred)
 
     # plot the results
     plt.figure(figsize=(18,15))
 
     figure, axes = color_graph_background(3,3)
+    cmap, norm = _digit_cmap_and_norm()
+    # Même étendue pour toutes les classes en mode density
+    extent = (projection[:, 0].min(), projection[:, 0].max(), projection[:, 1].min(), projection[:, 1].max())
     i = 0
     j = 0
 
@@ -456,17 +2955,17 @@ def draw_all_predict(X, y, y_pred, title="Représentation des prédictions", pro
         c = y_pred[mask]
         x_digit = projection[mask]
 
-        # ['viridis', 'cubehelix', 'plasma', 'inferno', 'magma', 'cividis']
-        if y is not None:
-            axe.scatter(x_digit[:, 0], x_digit[:, 1], label="Test", lw=0.2, c='b', cmap=plt.cm.get_cmap('viridis', 10))
-        
-        axe.scatter(x_digit[:, 0], x_digit[:, 1], label="predict", marker='P', lw=1, c=c, cmap=plt.cm.get_cmap('viridis', 10))
+        if mode == "density":
+            _draw_density(axe, x_digit, c, bins=bins, extent=extent)
+        else:
+            # ['viridis', 'cubehelix', 'plasma', 'inferno', 'magma', 'cividis']
+            if y is not None:
+                axe.scatter(x_digit[:, 0], x_digit[:, 1], label="Test", lw=0.2, c='b')
+
+            axe.scatter(x_digit[:, 0], x_digit[:, 1], label="predict", marker='P', lw=1, c=c, cmap=cmap, norm=norm)
+            axe.legend()
         axe.set_title(digit)
-        #pcm = axe.pcolormesh(ticks=range(11), label='digit value', cmap=plt.cm.get_cmap('viridis', 10))
-        
-        axe.legend()
-        pcm = axe.pcolormesh(np.random.random((20, 20)) * 11, cmap=plt.cm.get_cmap('viridis', 10))
-        figure.colorbar(pcm, ax=axe)
+        _digit_colorbar(figure, axe)
 
         j += 1
         if j == 3:
@@ -478,9 +2977,8 @@ def draw_all_predict(X, y, y_pred, title="Représentation des prédictions", pro
     figure.set_dpi(100)
     plt.show()
 
-import matplotlib as mat
-
-def draw_PrecisionRecall_and_RocCurve(model, Y_test, y_score, model_name="SVC", colors=None):
+def draw_PrecisionRecall_and_RocCurve(model, Y_test, y_score, model_name="SVC", colors=None, max_thresholds=1000):
+    """Y_test : labels entiers ou DataFrame one-hot ('class_0' ... 'class_9') ; y_score : matrice (n, 10)."""
     nb_lignes = 5
     nb_cols = 4
     ii = 0
@@ -488,12 +2986,19 @@ def draw_PrecisionRecall_and_RocCurve(model, Y_test, y_score, model_name="SVC",
     figure, axes = color_graph_background(nb_lignes,nb_cols)
     if colors is None:
         colors = list(mat.colors.get_named_colors_mapping().values())
-        
-    for i in range(0,10):
+
+    # Labels entiers : classes du modèle ; DataFrame one-hot : colonnes class_0 ... class_9
+    classes = model.classes_ if np.ndim(Y_test) == 1 and hasattr(model, "classes_") else None
+    curves = multiclass_curves(Y_test, y_score, classes=classes, max_thresholds=max_thresholds)
+
+    for i, (label, curve) in enumerate(list(curves.items())[:10]):
         ax = axes[ii][jj]
-        prec, recall, _ = precision_recall_curve(Y_test['class_'+str(i)], y_score[:,i], pos_label=model.classes_[1])
-        PrecisionRecallDisplay(precision=prec, recall=recall).plot(ax=ax, color=colors[i])
-        ax.set_title(str(i)+" - PrecisionRecall", fontsize=10)
+        # Tracé direct : l'API des *Display de sklearn pour les couleurs change selon les versions
+        ax.plot(curve["recall"], curve["precision"], color=colors[i], drawstyle="steps-post", label=f"AP = {curve['average_precision']:.2f}")
+        ax.set_xlabel("Recall")
+        ax.set_ylabel("Precision")
+        ax.legend(loc="lower left", fontsize=8)
+        ax.set_title(str(label)+" - PrecisionRecall", fontsize=10)
         jj += 1
         if jj == nb_cols:
             jj = 0
@@ -503,9 +3008,11 @@ def draw_PrecisionRecall_and_RocCurve(model, Y_test, y_score, model_name="SVC",
             ax.xaxis.set_ticklabels([])
         # -------------------------------------------------------------------------------------------
         ax = axes[ii][jj]
-        fpr, tpr, _ = roc_curve(Y_test['class_'+str(i)], y_score[:,i], pos_label=model.classes_[1])
-        RocCurveDisplay(fpr=fpr, tpr=tpr).plot(ax=ax, color=colors[i])
-        ax.set_title(str(i)+" - RocCurve", fontsize=10)
+        ax.plot(curve["fpr"], curve["tpr"], color=colors[i], label=f"AUC = {curve['roc_auc']:.2f}")
+        ax.set_xlabel("False Positive Rate")
+        ax.set_ylabel("True Positive Rate")
+        ax.legend(loc="lower right", fontsize=8)
+        ax.set_title(str(label)+" - RocCurve", fontsize=10)
         jj += 1
         if jj == nb_cols:
             jj = 0
@@ -517,6 +3024,7 @@ def draw_PrecisionRecall_and_RocCurve(model, Y_test, y_score, model_name="SVC",
     figure.set_size_inches(15, 15, forward=True)
     figure.set_dpi(100)
     plt.show()
+    return curves
 
 def draw_confusion(y_test, predictions_dic, verbose=0):
     nb_col = len(predictions_dic)
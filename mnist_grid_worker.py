@@ -0,0 +1,50 @@
+"""Worker de recherche sur grille distribuée (DistributedGridSearchCV / search="distributed").
+
+Sur la machine qui lance la recherche, la file doit écouter sur une adresse joignable :
+    import mnist_function
+    mnist_function.GRID_QUEUE_ADDRESS = ("0.0.0.0", 50000)
+    classifier_svc(X_train, y_train, search="distributed")
+    # affiche : Grid queue on ('0.0.0.0', 50000) authkey <clé> : ... tasks
+
+Puis sur chaque autre machine (avec le même code et les mêmes dépendances) :
+    python mnist_grid_worker.py --address coordinateur:50000 --authkey <clé> --workers 8
+
+La clé est aléatoire et change à chaque recherche (sauf si mnist_function.GRID_QUEUE_AUTHKEY est fixée) ;
+elle protège le coordinateur, qui exécute ce que lui envoie un pair authentifié : ne pas la diffuser.
+"""
+import argparse
+import multiprocessing
+import sys
+
+from mnist_function import run_grid_worker
+
+
+def _parse_address(address):
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker de recherche sur grille distribuée MNIST")
+    parser.add_argument("--address", required=True, help="hôte:port de la file de tâches")
+    parser.add_argument("--authkey", required=True, help="clé affichée par le coordinateur au lancement de la recherche")
+    parser.add_argument("--workers", type=int, default=1, help="nombre de processus worker sur cette machine")
+    parser.add_argument("--verbose", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    address, authkey = _parse_address(args.address), args.authkey.encode()
+    if args.workers == 1:
+        n_tasks = run_grid_worker(address, authkey, verbose=args.verbose)
+        print(n_tasks, "tasks done")
+        return 0
+    processes = [multiprocessing.Process(target=run_grid_worker, args=(address, authkey), kwargs={"verbose": args.verbose})
+                 for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
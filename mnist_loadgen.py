@@ -0,0 +1,105 @@
+"""Générateur de charge pour mnist_server.py (localhost).
+
+Exemple :
+    python mnist_loadgen.py --model KNN --concurrency 32 --requests 5000 --batch 1
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from mnist_function import MNIST_DATA_PATH, load_mnist
+from mnist_server import http_request, percentiles, read_http_message
+
+
+async def _client(host, port, model, X, request_ids, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in request_ids:
+            rows = X[i % len(X)]
+            payload = {"pixels": rows.tolist()}
+            t0 = time.perf_counter()
+            writer.write(http_request("POST", f"/predict/{quote(model)}", payload, host=host))
+            await writer.drain()
+            _, status, _, body = await read_http_message(reader)
+            latencies.append(time.perf_counter() - t0)
+            if int(status) != 200:
+                errors.append(body[:200])
+    finally:
+        writer.close()
+
+
+async def _get(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(http_request("GET", path, host=host, keep_alive=False))
+    await writer.drain()
+    _, status, _, body = await read_http_message(reader)
+    writer.close()
+    return int(status), json.loads(body)
+
+
+async def run_load(host="127.0.0.1", port=8000, model=None, n_requests=1000, concurrency=16, batch=1, X=None):
+    """Envoie n_requests requêtes de batch images depuis concurrency connexions ; retourne les mesures côté client."""
+    if model is None:
+        _, res = await _get(host, port, "/models")
+        model = res["models"][0]
+    if X is None:
+        X = np.random.RandomState(0).randint(0, 256, size=(1024, 784))
+    X = np.asarray(X)
+    # Découpage en requêtes de batch lignes
+    n_batches = max(len(X) // batch, 1)
+    X = X[:n_batches * batch].reshape(n_batches, batch, -1)
+    if batch == 1:
+        X = X[:, 0]
+
+    latencies, errors = [], []
+    t0 = time.perf_counter()
+    await asyncio.gather(*[_client(host, port, model, X, range(c, n_requests, concurrency), latencies, errors)
+                           for c in range(concurrency)])
+    seconds = time.perf_counter() - t0
+    p50, p99 = percentiles(latencies)
+    _, server_stats = await _get(host, port, "/stats")
+    return {"model": model,
+            "requests": n_requests,
+            "concurrency": concurrency,
+            "batch": batch,
+            "errors": len(errors),
+            "seconde": seconds,
+            "p50 ms": p50 * 1000,
+            "p99 ms": p99 * 1000,
+            "requests per s": n_requests / seconds,
+            "samples per s": n_requests * batch / seconds,
+            "server": server_stats}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Générateur de charge pour le serveur d'inférence MNIST")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default=None, help="modèle ciblé (le premier servi par défaut)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=1, help="nombre d'images par requête")
+    parser.add_argument("--data-path", default=None, help=f"images de test de load_mnist (ex : {MNIST_DATA_PATH}) au lieu d'images aléatoires")
+    parser.add_argument("--output", default=None, help="fichier JSON des résultats")
+    args = parser.parse_args(argv)
+
+    X = load_mnist(args.data_path)[1] if args.data_path else None
+    res = asyncio.run(run_load(args.host, args.port, args.model, args.requests, args.concurrency, args.batch, X=X))
+    print(f"{res['model']} : {res['requests']} requêtes x {res['batch']} images, concurrence {res['concurrency']}, erreurs {res['errors']}")
+    print(f"client : p50 {res['p50 ms']:.2f} ms  p99 {res['p99 ms']:.2f} ms  {res['requests per s']:.1f} req/s  {res['samples per s']:.1f} images/s")
+    server = res["server"]["models"].get(res["model"], res["server"])
+    if server["requests"]:
+        print(f"serveur : p50 {server['p50 ms']:.2f} ms  p99 {server['p99 ms']:.2f} ms  batch moyen {server['mean batch size']:.1f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(res, f, indent=2)
+    return 1 if res["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""Serveur HTTP local d'inférence pour les modèles MNIST entraînés, avec regroupement des requêtes en micro-batchs.
+
+Exemples :
+    # dans le notebook : ModelRegistry("model_registry").save_all(modeldic_full, scores)
+    python mnist_server.py --registry model_registry --models KNN "LinearSVC OVR" --port 8000
+    # ou : save_models(modeldic_full, "modeldic.pkl")
+    python mnist_server.py --models-path modeldic.pkl
+    curl -X POST localhost:8000/predict/KNN -d '{"pixels": [0, 0, ..., 0]}'
+    curl localhost:8000/stats
+
+Routes :
+    GET  /models                liste des modèles chargés
+    GET  /stats                 latences p50/p99, débit et taille moyenne des micro-batchs
+    POST /predict/<modèle>      {"pixels": [784 valeurs]} ou {"pixels": [[784 valeurs], ...]}
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+import numpy as np
+
+from mnist_function import ModelRegistry, batch_predict, load_models
+
+N_PIXELS = 784
+MAX_BATCH_SIZE = 256
+MAX_WAIT_MS = 5.0
+LATENCY_WINDOW = 10000
+MAX_BODY_SIZE = 64 * 1024**2
+
+
+def percentiles(values, q=(50, 99)):
+    if len(values) == 0:
+        return [None for _ in q]
+    return [float(v) for v in np.percentile(np.asarray(values), q)]
+
+
+class ServerStats:
+    """Compteurs du serveur ; les percentiles de latence portent sur les LATENCY_WINDOW dernières requêtes."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.start = time.perf_counter()
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.samples = 0
+        self.batches = 0
+        self.batch_samples = 0
+        self.errors = 0
+
+    def add_request(self, n_samples, seconds):
+        self.requests += 1
+        self.samples += n_samples
+        self.latencies.append(seconds)
+
+    def add_batch(self, n_samples):
+        self.batches += 1
+        self.batch_samples += n_samples
+
+    def snapshot(self):
+        uptime = time.perf_counter() - self.start
+        p50, p99 = percentiles(self.latencies)
+        return {"uptime seconde": uptime,
+                "requests": self.requests,
+                "samples": self.samples,
+                "errors": self.errors,
+                "batches": self.batches,
+                "mean batch size": self.batch_samples / self.batches if self.batches else None,
+                "p50 ms": p50 * 1000 if p50 is not None else None,
+                "p99 ms": p99 * 1000 if p99 is not None else None,
+                "requests per s": self.requests / uptime if uptime > 0 else None,
+                "samples per s": self.samples / uptime if uptime > 0 else None}
+
+
+class MicroBatcher:
+    """Regroupe les requêtes concurrentes d'un modèle : un batch part dès qu'il atteint max_batch_size
+    échantillons ou que la première requête a attendu max_wait_ms."""
+
+    def __init__(self, model, stats, executor, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.stats = stats
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def predict(self, X):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((X, future))
+        return await future
+
+    async def _collect(self):
+        items = [await self.queue.get()]
+        n_samples = items[0][0].shape[0]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while n_samples < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            items.append(item)
+            n_samples += item[0].shape[0]
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            X = np.concatenate([X for X, _ in items])
+            self.stats.add_batch(X.shape[0])
+            try:
+                y_pred = await loop.run_in_executor(self.executor, batch_predict, self.model, X)
+            except Exception as ex:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(ex)
+                continue
+            start = 0
+            for X_item, future in items:
+                if not future.done():
+                    future.set_result(y_pred[start:start + X_item.shape[0]])
+                start += X_item.shape[0]
+
+
+class InferenceServer:
+
+    def __init__(self, model_dic, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, n_threads=None):
+        self.model_dic = model_dic
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.executor = ThreadPoolExecutor(max_workers=n_threads)
+        self.stats = ServerStats()
+        self.model_stats = {name: ServerStats() for name in model_dic}
+        self.batchers = {}
+
+    async def start(self, host="127.0.0.1", port=8000):
+        for name, model in self.model_dic.items():
+            self.batchers[name] = MicroBatcher(model, self.model_stats[name], self.executor,
+                                               max_batch_size=self.max_batch_size, max_wait_ms=self.max_wait_ms)
+            self.batchers[name].start()
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await read_http_message(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self.route(method, unquote(target.split("?")[0]), body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if method == "GET" and path == "/stats":
+            stats = self.stats.snapshot()
+            stats["models"] = {name: model_stats.snapshot() for name, model_stats in self.model_stats.items()}
+            return 200, stats
+        if method == "GET" and path == "/models":
+            return 200, {"models": list(self.model_dic)}
+        if method == "POST" and path.startswith("/predict/"):
+            return await self.predict(path[len("/predict/"):], body)
+        return 404, {"error": f"Unknown route : {method} {path}"}
+
+    async def predict(self, model_name, body):
+        t0 = time.perf_counter()
+        if model_name not in self.batchers:
+            self.stats.errors += 1
+            return 404, {"error": f"Unknown model : {model_name}", "models": list(self.model_dic)}
+        try:
+            X = np.asarray(json.loads(body)["pixels"], dtype=np.float64)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+            if X.ndim != 2 or X.shape[1] != N_PIXELS or X.shape[0] == 0:
+                raise ValueError(f"pixels must have shape ({N_PIXELS},) or (n, {N_PIXELS}), got {X.shape}")
+        except (KeyError, TypeError, ValueError) as ex:
+            self.stats.errors += 1
+            return 400, {"error": str(ex)}
+        try:
+            y_pred = await self.batchers[model_name].predict(X)
+        except Exception as ex:
+            self.stats.errors += 1
+            self.model_stats[model_name].errors += 1
+            return 500, {"error": repr(ex)}
+        seconds = time.perf_counter() - t0
+        self.stats.add_request(X.shape[0], seconds)
+        self.model_stats[model_name].add_request(X.shape[0], seconds)
+        return 200, {"model": model_name, "predictions": np.asarray(y_pred).tolist()}
+
+
+async def read_http_message(reader):
+    """Lit une requête ou une réponse HTTP/1.1 (avec Content-Length) ; None si la connexion est fermée."""
+    start_line = await reader.readline()
+    if not start_line:
+        return None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_SIZE:
+        raise ValueError(f"Body too large : {length}")
+    body = await reader.readexactly(length) if length else b""
+    first, second, _ = start_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    return first, second, headers, body
+
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+def http_response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+
+def http_request(method, path, payload=None, host="127.0.0.1", keep_alive=True):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    head = (f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+
+async def serve(model_dic, host="127.0.0.1", port=8000, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, n_threads=None):
+    server = await InferenceServer(model_dic, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, n_threads=n_threads).start(host, port)
+    print("Serving", list(model_dic), "on", f"http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur local d'inférence MNIST avec micro-batchs")
+    parser.add_argument("--registry", default=None, help="répertoire d'un ModelRegistry (tableaux mappés en mémoire, partagés entre processus)")
+    parser.add_argument("--models-path", default="modeldic.pkl", help="fichier écrit par save_models(modeldic_full, ...), si --registry n'est pas utilisé")
+    parser.add_argument("--models", nargs="+", default=None, help="modèles à servir (tous par défaut)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--threads", type=int, default=None, help="threads de prédiction")
+    args = parser.parse_args(argv)
+
+    if args.registry:
+        model_dic = ModelRegistry(args.registry).load_all(args.models)
+    else:
+        model_dic = load_models(args.models_path, args.models)
+    try:
+        asyncio.run(serve(model_dic, args.host, args.port, args.max_batch_size, args.max_wait_ms, args.threads))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())